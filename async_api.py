@@ -0,0 +1,382 @@
+import asyncio
+import contextlib
+import contextvars
+import threading
+import time
+import weakref
+import zlib
+from urllib.parse import urljoin
+from xml.etree import ElementTree
+
+from main import (
+    ASYNC_MAX_AUDITS, ASYNC_MAX_REQUESTS, DEFAULT_PROFILE, MAX_PAGE_MB, POOL_SIZE, SITEMAP_MAX_FILES,
+    SITEMAP_MAX_MB, SITEMAP_WORKERS, STREAM_CHUNK_SIZE, USER_AGENT, _CHARSET_RE, StageMetrics, Transient,
+    _SitemapStopped, _StageCall, _aiohttp, apply_probes, asset_auditor, link_checker, link_targets, notify_metrics,
+    parse_page, parse_robots, peak_rss_mb, requests, robots_sitemaps, score_checks, select_checks, site_cache,
+    site_root, stylesheet_analyzer)
+
+
+_async_stage = contextvars.ContextVar('foxseo_stage', default=None)
+
+
+class AsyncLimiter:
+    def __init__(self, max_requests=ASYNC_MAX_REQUESTS, max_audits=ASYNC_MAX_AUDITS):
+        self.max_requests = max_requests
+        self.max_audits = max_audits
+        self.requests_in_flight = 0
+        self.audits_in_flight = 0
+        self._loops = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _semaphores(self):
+        # asyncio semaphores belong to one event loop, so every loop using the limiter gets its own pair.
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphores = self._loops.get(loop)
+            if semaphores is None:
+                semaphores = self._loops[loop] = (asyncio.Semaphore(self.max_requests),
+                                                  asyncio.Semaphore(self.max_audits))
+            return semaphores
+
+    @contextlib.asynccontextmanager
+    async def request(self):
+        async with self._semaphores()[0]:
+            self.requests_in_flight += 1
+            try:
+                yield
+            finally:
+                self.requests_in_flight -= 1
+
+    @contextlib.asynccontextmanager
+    async def audit(self):
+        async with self._semaphores()[1]:
+            self.audits_in_flight += 1
+            try:
+                yield
+            finally:
+                self.audits_in_flight -= 1
+
+    def stats(self):
+        return {'requests_in_flight': self.requests_in_flight, 'max_requests': self.max_requests,
+                'audits_in_flight': self.audits_in_flight, 'max_audits': self.max_audits}
+
+
+_default_async_limiter = None
+
+
+def get_async_limiter():
+    global _default_async_limiter
+    if _default_async_limiter is None:
+        _default_async_limiter = AsyncLimiter()
+    return _default_async_limiter
+
+
+def create_async_session(pool_size=POOL_SIZE, max_connections=ASYNC_MAX_REQUESTS, user_agent=USER_AGENT,
+                         headers=None):
+    aiohttp = _aiohttp()
+    connector = aiohttp.TCPConnector(limit=max_connections, limit_per_host=pool_size)
+    return aiohttp.ClientSession(connector=connector, headers=dict(headers or {}, **{'User-Agent': user_agent}))
+
+
+class AsyncResponse:
+    __slots__ = ('status', 'headers', 'content', 'url', 'truncated', 'elapsed')
+
+    def __init__(self, status, headers, content, url, truncated, elapsed):
+        self.status = status
+        self.headers = headers
+        self.content = content
+        self.url = url
+        self.truncated = truncated
+        self.elapsed = elapsed
+
+
+async def async_fetch(session, url, method='GET', limiter=None, timeout=10, max_bytes=None, read=True,
+                      on_chunk=None, allow_redirects=True):
+    aiohttp = _aiohttp()
+    stage = _async_stage.get()
+    limiter = limiter or get_async_limiter()
+    chunks = []
+    size = 0
+    truncated = False
+    started = time.perf_counter()
+    try:
+        async with limiter.request():
+            async with session.request(method, url, timeout=aiohttp.ClientTimeout(total=timeout),
+                                       allow_redirects=allow_redirects) as response:
+                if read and method != 'HEAD' and (on_chunk is None or response.status == 200):
+                    async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                        if max_bytes is not None and size + len(chunk) > max_bytes:
+                            chunk = chunk[:max_bytes - size]
+                            truncated = True
+                        size += len(chunk)
+                        if on_chunk is not None:
+                            on_chunk(chunk)
+                        else:
+                            chunks.append(chunk)
+                        if truncated:
+                            break
+    except Exception:
+        if stage is not None:
+            stage.failed.append(url)
+        raise
+    if stage is not None:
+        stage.received.append((response.status, size))
+    return AsyncResponse(response.status, requests.structures.CaseInsensitiveDict(response.headers), b''.join(chunks),
+                         str(response.url), truncated, time.perf_counter() - started)
+
+
+async def _timed_async(metrics, name, awaitable):
+    call = _StageCall(metrics, name)
+    token = _async_stage.set(call)
+    call.started = time.perf_counter()
+    exc_type = None
+    try:
+        return await awaitable
+    except BaseException as e:
+        exc_type = type(e)
+        raise
+    finally:
+        _async_stage.reset(token)
+        call.finish(exc_type)
+
+
+async def check_robots_async(url, session, limiter=None):
+    try:
+        response = await async_fetch(session, urljoin(url, '/robots.txt'), limiter=limiter, timeout=5)
+        if response.status >= 500:
+            return Transient((False, "", False))
+        has_robots = response.status == 200
+        match = _CHARSET_RE.search(response.headers.get('Content-Type', ''))
+        robots_content = response.content.decode(match.group(1) if match else 'utf-8', 'replace') if has_robots else ""
+        has_disallow = parse_robots(robots_content) if has_robots else False
+        return has_robots, robots_content, has_disallow
+    except Exception:
+        return Transient((False, "", False))
+
+
+async def check_wp_content_async(url, session, limiter=None):
+    try:
+        response = await async_fetch(session, urljoin(url, '/wp-content/'), 'HEAD', limiter, timeout=5,
+                                     allow_redirects=False)
+        return response.status == 200
+    except Exception:
+        return False
+
+
+async def fetch_with_redirect_check_async(base_url, variant, session, limiter=None):
+    test_url = base_url.replace('https://', f'https://{variant}.') if variant else base_url.replace('https://', 'http://')
+    try:
+        response = await async_fetch(session, test_url, limiter=limiter, timeout=5, read=False)
+        return response.status < 400 and response.url == base_url
+    except Exception:
+        return False
+
+
+async def check_www_redirect_async(url, session, limiter=None):
+    return await fetch_with_redirect_check_async(url, 'www', session, limiter)
+
+
+async def check_non_www_redirect_async(url, session, limiter=None):
+    return await fetch_with_redirect_check_async(url.replace('www.', ''), None, session, limiter)
+
+
+async def read_sitemap_async(location, session, limiter=None, max_children=SITEMAP_MAX_FILES,
+                             max_bytes=SITEMAP_MAX_MB * 1024 * 1024):
+    parser = ElementTree.XMLPullParser(events=('start', 'end'))
+    state = {'root': None, 'count': 0, 'decompressor': None, 'size': 0}
+    children = []
+
+    def feed(chunk):
+        if state['size'] == 0 and state['decompressor'] is None and chunk[:2] == b'\x1f\x8b':
+            state['decompressor'] = zlib.decompressobj(31)
+        if state['decompressor'] is not None:
+            chunk = state['decompressor'].decompress(chunk, max_bytes - state['size'])
+        state['size'] += len(chunk)
+        parser.feed(chunk)
+        for event, element in parser.read_events():
+            if state['root'] is None:
+                state['root'] = element
+                continue
+            tag = element.tag.rsplit('}', 1)[-1]
+            if event != 'end':
+                continue
+            if tag == 'loc' and element.text:
+                if state['root'].tag.endswith('sitemapindex'):
+                    if len(children) < max_children:
+                        children.append(urljoin(location, element.text.strip()))
+                else:
+                    state['count'] += 1
+            elif tag in ('url', 'sitemap'):
+                state['root'].clear()
+        if state['size'] >= max_bytes:
+            raise _SitemapStopped()
+
+    try:
+        response = await async_fetch(session, location, limiter=limiter, timeout=5, max_bytes=max_bytes,
+                                     on_chunk=feed)
+        if response.status != 200:
+            return False, 0, children, response.status >= 500
+        parser.close()
+        return state['root'] is not None, state['count'], children, False
+    except (_aiohttp().ClientError, asyncio.TimeoutError):
+        return state['count'] > 0, state['count'], children, True
+    except (ElementTree.ParseError, zlib.error, _SitemapStopped):
+        return state['count'] > 0, state['count'], children, False
+
+
+async def walk_sitemaps_async(locations, session, limiter=None, max_sitemaps=SITEMAP_MAX_FILES,
+                              workers=SITEMAP_WORKERS):
+    seen = set()
+    found = False
+    failed = False
+    total = 0
+    pending = set()
+    slots = asyncio.Semaphore(workers)
+
+    async def read(location):
+        async with slots:
+            return await read_sitemap_async(location, session, limiter, max_sitemaps)
+
+    def submit(location):
+        if location not in seen and len(seen) < max_sitemaps:
+            seen.add(location)
+            pending.add(asyncio.ensure_future(read(location)))
+
+    for location in locations:
+        submit(location)
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                pending.discard(task)
+                ok, count, children, unavailable = task.result()
+                found = found or ok
+                failed = failed or unavailable
+                total += count
+                for child in children:
+                    submit(child)
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.wait(pending)
+    return found, total, len(seen), failed
+
+
+async def check_sitemap_async(url, session, limiter=None, cache=None):
+    try:
+        cache = cache if cache is not None else site_cache
+        root = site_root(url)
+        has_robots, robots_content, _ = await cache.get_or_compute_async(
+            (root, 'robots'), lambda: check_robots_async(root, session, limiter))
+        locations = (robots_sitemaps(robots_content) if has_robots else []) or [urljoin(root, '/sitemap.xml')]
+        found, count, _, failed = await walk_sitemaps_async(locations, session, limiter)
+        return Transient((found, count)) if failed else (found, count)
+    except Exception:
+        return Transient((False, 0))
+
+
+async def analyze_seo_async(url, session=None, limiter=None, executor=None, cache=None, checker=None,
+                            css_analyzer=None, auditor=None, max_page_bytes=MAX_PAGE_MB * 1024 * 1024,
+                            max_links=None, profile=DEFAULT_PROFILE, timeout=10, metrics_hook=None):
+    limiter = limiter or get_async_limiter()
+    own_session = session is None
+    if own_session:
+        session = create_async_session()
+    metrics = StageMetrics()
+    try:
+        async with limiter.audit():
+            result = await _analyze_seo_async(
+                url, session, limiter, executor, metrics, cache if cache is not None else site_cache,
+                checker or link_checker, css_analyzer or stylesheet_analyzer, auditor or asset_auditor,
+                max_page_bytes, max_links, profile, timeout)
+    except Exception:
+        notify_metrics(metrics_hook, url, metrics.snapshot())
+        raise
+    finally:
+        if own_session:
+            await session.close()
+    notify_metrics(metrics_hook, url, result.stages)
+    return result
+
+
+async def _analyze_seo_async(url, session, limiter, executor, metrics, cache, checker, css_analyzer, auditor,
+                             max_page_bytes, max_links, profile, timeout):
+    checks, skipped_checks, inputs = select_checks(profile)
+    loop = asyncio.get_running_loop()
+    root = site_root(url)
+    tasks = []
+
+    def start(name, awaitable):
+        task = asyncio.ensure_future(_timed_async(metrics, name, awaitable))
+        tasks.append(task)
+        return task
+
+    def site_probe(name, probe, *args):
+        return start(name, cache.get_or_compute_async((root, name), lambda: probe(root, *args)))
+
+    async def results(futures):
+        return [await future for future in futures]
+
+    try:
+        robots_task = sitemap_task = www_task = non_www_task = wp_task = None
+        if 'robots' in inputs:
+            robots_task = site_probe('robots', check_robots_async, session, limiter)
+        if 'sitemap' in inputs:
+            sitemap_task = site_probe('sitemap', check_sitemap_async, session, limiter, cache)
+        if 'redirects' in inputs:
+            www_task = site_probe('www', check_www_redirect_async, session, limiter)
+            non_www_task = site_probe('non_www', check_non_www_redirect_async, session, limiter)
+        if 'wp_content' in inputs:
+            wp_task = site_probe('wp_content', check_wp_content_async, session, limiter)
+
+        try:
+            response = await _timed_async(metrics, 'fetch', async_fetch(session, url, limiter=limiter, timeout=timeout,
+                                                                        max_bytes=max_page_bytes))
+            if response.status >= 400:
+                raise Exception(f"{response.status} error for url: {url}")
+            result, internal_links, external_links, assets, css_links, inline_css = await _timed_async(
+                metrics, 'parse', loop.run_in_executor(executor, parse_page, response.content, url, response.headers,
+                                                       response.elapsed, response.truncated, None, max_page_bytes))
+            html_bytes = len(response.content)
+            del response
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            raise Exception(f"Error analyzing URL: {str(e)}")
+
+        link_tasks = css_tasks = asset_tasks = None
+        if 'links' in inputs:
+            link_tasks = [start('links', checker.check_async(link, session, limiter))
+                          for link in link_targets(internal_links | external_links, max_links)]
+        if 'css' in inputs:
+            css_tasks = [start('css', css_analyzer.check_async(css_url, session, limiter)) for css_url in css_links]
+        else:
+            inline_css = []
+        if 'assets' in inputs:
+            asset_tasks = [start('assets', auditor.check_async(asset_url, session, limiter)) for asset_url in assets]
+
+        apply_probes(
+            result, html_bytes,
+            robots=await robots_task if robots_task is not None else None,
+            sitemap=await sitemap_task if sitemap_task is not None else None,
+            redirects=(await www_task, await non_www_task) if www_task is not None else None,
+            visible_plugins=await wp_task if wp_task is not None else None,
+            link_results=await results(link_tasks) if link_tasks is not None else None,
+            css_results=await results(css_tasks) if css_tasks is not None else None,
+            inline_css=inline_css,
+            asset_results=[dict(asset, type=kind) for asset, kind in zip(await results(asset_tasks), assets.values())]
+            if asset_tasks is not None else None)
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        # Wait for the cancelled probes, so a session closed by the caller is no longer in use.
+        await asyncio.gather(*tasks, return_exceptions=True)
+    result.profile = profile
+    result.skipped_checks = skipped_checks
+    result.process_peak_rss_mb = peak_rss_mb()
+    with metrics.stage('scoring'):
+        score_checks(checks, result)
+    result.stages = metrics.snapshot()
+    return result
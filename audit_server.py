@@ -0,0 +1,201 @@
+import io
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, parse_qs
+
+from main import (
+    BATCH_WORKERS, DEFAULT_PROFILE, PROBE_WORKERS, PROFILES, RESULT_CACHE_SIZE, RESULT_CACHE_TTL, SERVER_PORT,
+    TTLCache, analyze_seo, asset_auditor, get_report_renderer, get_session, link_checker, normalize_input_url,
+    normalize_url, notify_metrics, peak_rss_mb, report_filename, session_stats, site_cache, stage_record,
+    stylesheet_analyzer)
+
+
+class _Audit:
+    __slots__ = ('result', 'json', 'report', 'lock')
+
+    def __init__(self, result):
+        self.result = result
+        self.json = None
+        self.report = None
+        self.lock = threading.Lock()
+
+
+class AuditService:
+    ENDPOINTS = ('/analyze', '/report', '/stats')
+
+    def __init__(self, session=None, workers=BATCH_WORKERS, result_ttl=RESULT_CACHE_TTL,
+                 result_cache_size=RESULT_CACHE_SIZE, renderer=None, **options):
+        workers = max(1, workers)
+        self.session = session or get_session()
+        self.profile = options.pop('profile', DEFAULT_PROFILE)
+        self.options = options
+        self.renderer = renderer or get_report_renderer()
+        self.audits = TTLCache(result_cache_size, result_ttl)
+        self._slots = threading.BoundedSemaphore(workers)
+        self._executor = ThreadPoolExecutor(max_workers=workers * PROBE_WORKERS)
+        self._lock = threading.Lock()
+        self._started = time.time()
+        self.analyses = 0
+        self.running = 0
+        self.endpoints = {}
+
+    def audit(self, url, profile=None, fresh=False):
+        url = normalize_url(normalize_input_url(url))
+        if not urlparse(url).hostname:
+            raise ValueError(f"invalid URL: {url}")
+        profile = profile or self.profile
+        if profile not in PROFILES:
+            raise ValueError(f"unknown profile: {profile}")
+        key = (url, profile)
+        if fresh:
+            self.audits.discard(key)
+        computed = []
+
+        def compute():
+            computed.append(True)
+            return _Audit(self._analyze(url, profile))
+
+        return self.audits.get_or_compute(key, compute), not computed
+
+    def _analyze(self, url, profile):
+        with self._slots:
+            with self._lock:
+                self.running += 1
+            try:
+                return analyze_seo(url, executor=self._executor, session=self.session, profile=profile,
+                                   **self.options)
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.analyses += 1
+
+    def analysis_json(self, url, profile=None, fresh=False):
+        audit, cached = self.audit(url, profile, fresh)
+        if audit.json is None:
+            audit.json = json.dumps(audit.result.to_dict(), ensure_ascii=False).encode('utf-8')
+        return audit, cached
+
+    def report(self, url, profile=None, fresh=False):
+        audit, cached = self.audit(url, profile, fresh)
+        with audit.lock:
+            if audit.report is None:
+                stream = io.BytesIO()
+                elapsed = self.renderer.render(audit.result, stream)
+                notify_metrics(self.options.get('metrics_hook'), audit.result.url, {'render': stage_record(elapsed)})
+                audit.report = stream.getvalue()
+        return audit, cached
+
+    def record(self, endpoint, seconds, failed=False):
+        with self._lock:
+            stats = self.endpoints.setdefault(endpoint, {'requests': 0, 'errors': 0, 'seconds': 0.0, 'max': 0.0})
+            stats['requests'] += 1
+            stats['errors'] += failed
+            stats['seconds'] += seconds
+            stats['max'] = max(stats['max'], seconds)
+
+    def stats(self):
+        with self._lock:
+            endpoints = {name: {'requests': stats['requests'], 'errors': stats['errors'],
+                                'mean_ms': round(stats['seconds'] / stats['requests'] * 1000, 1),
+                                'max_ms': round(stats['max'] * 1000, 1)}
+                         for name, stats in self.endpoints.items()}
+            analyses, running = self.analyses, self.running
+        return {
+            'uptime': round(time.time() - self._started, 1),
+            'analyses': analyses,
+            'running': running,
+            'endpoints': endpoints,
+            'results': self.audits.stats(),
+            'http': session_stats(self.session),
+            'site_cache': (self.options.get('cache') or site_cache).stats(),
+            'link_cache': (self.options.get('checker') or link_checker).cache.stats(),
+            'css_cache': (self.options.get('css_analyzer') or stylesheet_analyzer).cache.stats(),
+            'asset_cache': (self.options.get('auditor') or asset_auditor).cache.stats(),
+            'render': self.renderer.stats(),
+            'peak_rss_mb': peak_rss_mb(),
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def create_audit_server(service, host='127.0.0.1', port=SERVER_PORT):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class AuditRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        server_version = 'FoxSEO'
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            started = time.perf_counter()
+            service = self.server.service
+            parsed = urlparse(self.path)
+            endpoint = parsed.path.rstrip('/') or '/'
+            params = {name: values[-1] for name, values in parse_qs(parsed.query).items()}
+            fresh = params.get('fresh', '').lower() in ('1', 'true', 'yes')
+            headers = {}
+            try:
+                if endpoint == '/analyze':
+                    audit, cached = service.analysis_json(params.get('url', ''), params.get('profile'), fresh)
+                    status, content_type, body = 200, 'application/json', audit.json
+                    headers['X-Cache'] = 'hit' if cached else 'miss'
+                elif endpoint == '/report':
+                    audit, cached = service.report(params.get('url', ''), params.get('profile'), fresh)
+                    status, content_type, body = 200, 'application/pdf', audit.report
+                    headers['X-Cache'] = 'hit' if cached else 'miss'
+                    headers['Content-Disposition'] = \
+                        f'inline; filename="{os.path.basename(report_filename(audit.result.url))}"'
+                elif endpoint == '/stats':
+                    status, content_type, body = 200, 'application/json', json.dumps(service.stats()).encode('utf-8')
+                else:
+                    status, content_type, body = 404, 'application/json', b'{"error": "not found"}'
+            except ValueError as e:
+                status, content_type, body = 400, 'application/json', json.dumps({'error': str(e)}).encode('utf-8')
+            except Exception as e:
+                print(f"[failed] {params.get('url')}: {str(e)}")
+                status, content_type, body = 502, 'application/json', json.dumps({'error': str(e)}).encode('utf-8')
+
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+            service.record(endpoint if endpoint in service.ENDPOINTS else 'other', time.perf_counter() - started,
+                           status >= 400)
+
+        def log_message(self, *args):
+            pass
+
+
+    class AuditServer(ThreadingHTTPServer):
+        daemon_threads = True
+        request_queue_size = 128
+
+        def __init__(self, address, service):
+            super().__init__(address, AuditRequestHandler)
+            self.service = service
+
+        def handle_error(self, request, client_address):
+            if not isinstance(sys.exc_info()[1], ConnectionError):
+                super().handle_error(request, client_address)
+
+    return AuditServer((host, port), service)
+
+
+def serve(service, host='127.0.0.1', port=SERVER_PORT):
+    server = create_audit_server(service, host, port)
+    print(f"Serving /analyze, /report and /stats on http://{host}:{server.server_address[1]}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
@@ -0,0 +1,698 @@
+import argparse
+import compileall
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from bs4 import BeautifulSoup
+
+import main
+from pdf_report import ReportRenderer
+
+
+def synthetic_page(size_kb=1024):
+    head = ('<html><head><title>Synthetic benchmark page for the SEO analyzer</title>'
+            '<meta name="description" content="A generated page used to benchmark DOM extraction.">'
+            '<meta property="og:title" content="Benchmark"><link rel="canonical" href="https://example.com/">'
+            '<link rel="stylesheet" href="/style.css"><script src="/app.js"></script>'
+            '<script type="application/ld+json">{"@type": "WebPage"}</script></head><body>')
+    block = ('<div class="section"><h2>Section heading {i}</h2>'
+             '<p>Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor incididunt '
+             'ut labore et dolore magna aliqua. <a href="/page-{i}">Internal link {i}</a> and '
+             '<a href="https://external-{i}.example.org/">external link</a>.</p>'
+             '<img src="/images/{i}.jpg" alt="Image {i}"><img src="/images/{i}-b.jpg">'
+             '<ul><li>First item</li><li>Second item</li><li>Third item</li></ul></div>')
+    parts = [head, '<h1>Synthetic benchmark page</h1>']
+    size = len(head)
+    i = 0
+    while size < size_kb * 1024:
+        chunk = block.format(i=i)
+        parts.append(chunk)
+        size += len(chunk)
+        i += 1
+    parts.append('</body></html>')
+    return ''.join(parts)
+
+
+def legacy_dom_scan(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    title = soup.find('title')
+    meta_desc = soup.find('meta', attrs={'name': 'description'})
+    result = {
+        'title': title.get_text().strip() if title else "",
+        'meta_description': meta_desc.get('content', '').strip() if meta_desc else "",
+        'h1': [h1.get_text().strip() for h1 in soup.find_all('h1')],
+        'h2': [h2.get_text().strip() for h2 in soup.find_all('h2')],
+        'images': soup.find_all('img'),
+        'links': [a['href'] for a in soup.find_all('a', href=True)],
+        'text': soup.get_text(separator=' ', strip=True),
+        'canonical': soup.find('link', attrs={'rel': 'canonical'}),
+        'noindex': soup.find('meta', attrs={'name': 'robots', 'content': re.compile('noindex', re.I)}),
+        'og_tags': soup.find_all('meta', attrs={'property': re.compile('^og:')}),
+        'schema': soup.find('script', attrs={'type': 'application/ld+json'}),
+        'broken_link_sample': soup.find_all('a', href=True),
+        'css_links': soup.find_all('link', rel='stylesheet'),
+        'scripts': soup.find_all('script', src=True),
+        'styles': soup.find_all('link', rel='stylesheet'),
+    }
+    return result
+
+
+def synthetic_text(words=100000, vocabulary=5000, seed=1, prose=False):
+    rng = random.Random(seed)
+    terms = [f"term{i}" for i in range(vocabulary)]
+    # In prose the stopwords are the most frequent words; otherwise they are the rarest.
+    terms = sorted(main.STOPWORDS) + terms if prose else terms + sorted(main.STOPWORDS)
+    weights = [1 / (rank + 1) for rank in range(len(terms))]
+    return ' '.join(rng.choices(terms, weights=weights, k=words)) + '.'
+
+
+def legacy_extract_keywords(text, n=1, top_k=10):
+    text = re.sub(r'[^\w\s]', '', text.lower())
+    words = text.split()
+    if n == 1:
+        counter = Counter(words)
+    else:
+        ngrams = [' '.join(words[i:i + n]) for i in range(len(words) - n + 1)]
+        counter = Counter(ngrams)
+    return counter.most_common(top_k)
+
+
+def sample_result(profile='full'):
+    keywords = ['analyzer', 'benchmark', 'report', 'page', 'keyword']
+    return main.AnalysisResult(
+        url='https://example.com/blog/benchmark-post', title='Synthetic benchmark page for the SEO analyzer report',
+        title_length=52, meta_description='A generated result used to benchmark PDF rendering. ' * 3,
+        meta_desc_length=156, common_keywords=', '.join(keywords * 2), keywords_title_desc=keywords[:3],
+        top_keywords=keywords, keyword_usage={kw: {'title': True, 'description': False, 'headings': True}
+                                              for kw in keywords},
+        h1_count=1, h1_tags=['Synthetic benchmark page'], h2_count=12, h2_tags=[f'Section {i}' for i in range(7)],
+        image_count=40, images_without_alt_count=12, images_without_alt=[f'/images/{i}.jpg' for i in range(3)],
+        internal_links=80, external_links=20, canonical='https://example.com/blog/benchmark-post',
+        has_noindex=False, has_og_tags=True, has_schema=True, is_fresh=False, days_ago=120, html_size=84.2,
+        html_truncated=False, response_time=0.42, total_requests=56, script_count=8, stylesheet_count=6,
+        unminified_js=['/app.js', '/vendor.js'], is_https=True, has_robots=True,
+        robots_content='User-agent: *\nDisallow: /private\nSitemap: https://example.com/sitemap.xml',
+        has_disallow=True, has_sitemap=True, sitemap_count=1200, proper_canonicalization=True,
+        visible_plugins=False, has_broken_links=True, broken_count=3, checked_links=100,
+        broken_links=[(f'https://example.com/missing-{i}', 404) for i in range(3)], has_media_queries=True,
+        css_bytes=180000, css_files=6, inline_styles=2, unminified_css=['/style.css'], has_image_expires=False,
+        page_weight=2400000, unknown_size_assets=2,
+        heaviest_assets=[(f'https://example.com/images/hero-{i}.jpg', 400000 - i * 50000) for i in range(5)],
+        uncached_assets=[f'https://example.com/images/{i}.jpg' for i in range(10)], uncached_count=25,
+        profile=profile, score=64, total_items=25, issues=5, recommendations=4, good_results=16,
+    )
+
+
+def measure(func, repeat):
+    return min(timings(func, repeat))
+
+
+def command_timings(command, repeat):
+    return timings(lambda: subprocess.run(command, check=True, stdout=subprocess.DEVNULL,
+                                          cwd=os.path.dirname(os.path.abspath(main.__file__))), repeat)
+
+
+def import_timings(repeat):
+    compileall.compile_dir(os.path.dirname(os.path.abspath(main.__file__)), maxlevels=0, quiet=1)
+    return command_timings([sys.executable, '-c', 'import main'], repeat)
+
+
+def timings(func, repeat):
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    return runs
+
+
+SITE_DEFAULTS = {
+    'latency_ms': 20,
+    'page_kb': 50,
+    'pages': 50,
+    'images': 20,
+    'stylesheets': 3,
+    'scripts': 5,
+    'links': 30,
+    'asset_kb': 20,
+    'sitemap_urls': 1000,
+    'redirects': 1,
+}
+
+
+def site_page(index, base_url, config, revision=0):
+    pages = config['pages']
+    external = base_url.replace('127.0.0.1', 'localhost')
+    head = [f'<html><head><title>Synthetic page {index} of the benchmark site for the SEO analyzer</title>',
+            '<meta name="description" content="A generated page of the local benchmark site, used to measure '
+            'the analysis of pages, probes, links and assets without touching the internet.">',
+            f'<link rel="canonical" href="{base_url}/page/{index}"><meta property="og:title" content="Page {index}">',
+            '<script type="application/ld+json">{"@type": "WebPage"}</script>']
+    head += [f'<link rel="stylesheet" href="/css/{i}.css">' for i in range(config['stylesheets'])]
+    head += [f'<script src="/js/{i}.js"></script>' for i in range(config['scripts'])]
+    body = [f'</head><body><h1>Benchmark page, revision {revision}</h1>' if revision else
+            '</head><body><h1>Benchmark page</h1>']
+    body += [f'<img src="/img/{index}-{i}.jpg">' if revision and not i else
+             f'<img src="/img/{index}-{i}.jpg" alt="Image {i}">' for i in range(config['images'])]
+    body += [f'<a href="/page/{(index + i + 1) % pages}">Page {i}</a>' if i % 3 else
+             f'<a href="{external}/page/{i}">External {i}</a>' for i in range(config['links'])]
+    parts = head + body
+    size = sum(len(part) for part in parts)
+    i = 0
+    while size < config['page_kb'] * 1024:
+        block = (f'<h2>Section {i}</h2><p>Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod '
+                 f'tempor incididunt ut labore et dolore magna aliqua, benchmark page {index} section {i}.</p>')
+        parts.append(block)
+        size += len(block)
+        i += 1
+    parts.append('</body></html>')
+    return ''.join(parts).encode('utf-8')
+
+
+def site_response(path, base_url, config, revisions=None):
+    cached = [('Cache-Control', 'max-age=86400')]
+    if path.startswith('/go/'):
+        _, _, hops, rest = path.split('/', 3)
+        target = f'/go/{int(hops) - 1}/{rest}' if int(hops) > 1 else f'/{rest}'
+        return 301, [('Location', base_url + target)], b''
+    if path == '/' or path.startswith('/page/'):
+        index = int(path.rsplit('/', 1)[1] or 0) if path != '/' else 0
+        revision = revisions.get(index, 0) if revisions else 0
+        return 200, [('Content-Type', 'text/html; charset=utf-8'),
+                     ('Last-Modified', 'Mon, 01 Jan 2024 00:00:00 GMT')], site_page(index, base_url, config, revision)
+    if path == '/robots.txt':
+        return 200, [('Content-Type', 'text/plain')], \
+            f"User-agent: *\nDisallow: /private/\nSitemap: {base_url}/sitemap.xml\n".encode('ascii')
+    if path == '/sitemap.xml' and config['sitemap_urls']:
+        urls = ''.join(f'<url><loc>{base_url}/page/{i}</loc></url>' for i in range(config['sitemap_urls']))
+        return 200, [('Content-Type', 'application/xml')], \
+            f'<?xml version="1.0" encoding="UTF-8"?><urlset>{urls}</urlset>'.encode('ascii')
+    if path.startswith('/css/'):
+        rule = '.block{margin:0;padding:0;color:#333}'
+        css = '@media (max-width: 600px){.block{display:none}}' + rule * (config['asset_kb'] * 1024 // len(rule))
+        return 200, [('Content-Type', 'text/css')] + cached, css.encode('ascii')
+    if path.startswith('/js/'):
+        return 200, [('Content-Type', 'application/javascript')] + cached, b'var x=1;' * (config['asset_kb'] * 128)
+    if path.startswith('/img/'):
+        return 200, [('Content-Type', 'image/jpeg')] + cached, b'\xff' * (config['asset_kb'] * 1024)
+    return 404, [('Content-Type', 'text/plain')], b'not found'
+
+
+def site_handler(config):
+    latency = config['latency_ms'] / 1000
+    revisions = {}
+
+    class SyntheticSiteHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            self.respond(True)
+
+        def do_HEAD(self):
+            self.respond(False)
+
+        def respond(self, send_body):
+            time.sleep(latency)
+            base_url = f"http://{self.headers.get('Host', '127.0.0.1')}"
+            path = self.path.split('?', 1)[0]
+            if path.startswith('/_revise/'):
+                for index in range(int(path.rsplit('/', 1)[1])):
+                    revisions[index] = revisions.get(index, 0) + 1
+                status, headers, body = 200, [('Content-Type', 'text/plain')], b'revised'
+            else:
+                status, headers, body = site_response(path, base_url, config, revisions)
+            self.send_response(status)
+            for name, value in headers:
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if send_body:
+                self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return SyntheticSiteHandler
+
+
+class SiteServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def serve_site(config, ready):
+    server = SiteServer(('127.0.0.1', 0), site_handler(config))
+    ready.put(server.server_address[1])
+    server.serve_forever()
+
+
+@contextlib.contextmanager
+def spawned_server(target, *args):
+    context = multiprocessing.get_context('spawn')
+    ready = context.Queue()
+    process = context.Process(target=target, args=args + (ready,), daemon=True)
+    process.start()
+    try:
+        yield f"http://127.0.0.1:{ready.get(timeout=30)}"
+    finally:
+        process.terminate()
+        process.join()
+
+
+def local_site(config):
+    return spawned_server(serve_site, config)
+
+
+class NullReportWriter(main.ReportWriter):
+    def write(self, result):
+        return None
+
+
+def fresh_options():
+    return {
+        'session': main.create_session(),
+        'cache': main.TTLCache(),
+        'checker': main.LinkChecker(),
+        'css_analyzer': main.StylesheetAnalyzer(),
+        'auditor': main.AssetAuditor(),
+    }
+
+
+def timing_result(runs, **extra):
+    return dict({'best': round(min(runs), 4), 'median': round(statistics.median(runs), 4), 'runs': len(runs)}, **extra)
+
+
+def bench_suite(args):
+    config = {name: getattr(args, name) for name in SITE_DEFAULTS}
+    results = {}
+
+    results['import_main'] = timing_result(import_timings(args.repeat))
+
+    text = synthetic_text(args.words)
+    results['extract_keywords'] = timing_result(timings(lambda: main.extract_keywords(text), args.repeat),
+                                                words=args.words)
+
+    renderer = ReportRenderer()
+    report = sample_result()
+    with tempfile.TemporaryDirectory() as directory:
+        output_file = os.path.join(directory, 'report.pdf')
+        results['generate_pdf'] = timing_result(
+            timings(lambda: main.generate_pdf(report, output_file, renderer=renderer), args.repeat))
+
+    with local_site(config) as base_url:
+        page_url = f"{base_url}/go/{config['redirects']}/page/1" if config['redirects'] else f"{base_url}/page/1"
+        for profile in sorted(main.PROFILES):
+            stages = {}
+
+            def analyze():
+                options = fresh_options()
+                with options['session']:
+                    stages.update(main.analyze_seo(page_url, profile=profile, **options).stages)
+
+            runs = timings(analyze, args.repeat)
+            results[f'analyze_seo_{profile}'] = timing_result(
+                runs, requests=sum(stage['requests'] for stage in stages.values()))
+
+        urls = [f"{base_url}/page/{i}" for i in range(config['pages'])]
+        runs = []
+        for _ in range(args.batch_repeat):
+            options = fresh_options()
+            with options['session'], contextlib.redirect_stdout(io.StringIO()):
+                summary = main.run_batch(urls, workers=args.workers, per_host=args.workers,
+                                         writer=NullReportWriter(), profile=args.batch_profile, **options)
+            if summary['failed']:
+                raise RuntimeError(f"batch benchmark failed: {summary['failures'][:3]}")
+            runs.append(summary['elapsed'])
+        results['batch'] = timing_result(runs, pages=len(urls), workers=args.workers, profile=args.batch_profile,
+                                         pages_per_minute=round(len(urls) / min(runs) * 60, 1))
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'cpus': os.cpu_count(), 'html_parser': main.HTML_PARSER},
+        'config': dict(config, repeat=args.repeat, words=args.words, workers=args.workers,
+                       batch_profile=args.batch_profile),
+        'results': results,
+    }
+    print_suite(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as stream:
+            json.dump(report, stream, indent=2)
+        print(f"Results saved to: {args.output}")
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as stream:
+            baseline = json.load(stream)
+        if compare_suites(baseline, report, args.threshold):
+            sys.exit(1)
+
+
+def print_suite(report):
+    print(f"Benchmark suite ({report['environment']['python']}, {report['environment']['cpus']} CPUs):")
+    for name, result in report['results'].items():
+        extra = ', '.join(f"{key} {value}" for key, value in result.items() if key not in ('best', 'median', 'runs'))
+        print(f"  {name:<22} best {result['best'] * 1000:9.1f} ms  median {result['median'] * 1000:9.1f} ms"
+              f"{'  (' + extra + ')' if extra else ''}")
+
+
+def compare_suites(baseline, current, threshold):
+    if baseline.get('config') != current['config']:
+        print("Warning: the baseline was run with a different configuration.")
+    regressions = []
+    print(f"Compared to {baseline.get('created', 'the baseline')}:")
+    for name, result in current['results'].items():
+        previous = baseline.get('results', {}).get(name)
+        if not previous:
+            continue
+        change = (result['best'] - previous['best']) / previous['best'] * 100 if previous['best'] else 0.0
+        regressed = change > threshold
+        if regressed:
+            regressions.append(name)
+        print(f"  {name:<22} {previous['best'] * 1000:9.1f} ms -> {result['best'] * 1000:9.1f} ms  "
+              f"{change:+6.1f}%{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def serve_audits(workers, profile, ready):
+    server = main.create_audit_server(main.AuditService(workers=workers, profile=profile), port=0)
+    ready.put(server.server_address[1])
+    server.serve_forever()
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def load_result(latencies, elapsed, statuses, cache):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'seconds': round(elapsed, 3),
+        'per_second': round(len(latencies) / elapsed, 1) if elapsed > 0 else 0.0,
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 1),
+        'max_ms': round(latencies[-1] * 1000, 1),
+        'errors': sum(count for status, count in statuses.items() if status != 200),
+        'cache_hits': cache['hit'],
+    }
+
+
+def generate_load(server_url, urls, concurrency, endpoint='analyze'):
+    targets = iter(urls)
+    lock = threading.Lock()
+    latencies = []
+    statuses = Counter()
+    cache = Counter()
+
+    def client():
+        with requests.Session() as session:
+            while True:
+                with lock:
+                    url = next(targets, None)
+                if url is None:
+                    return
+                started = time.perf_counter()
+                try:
+                    response = session.get(f"{server_url}/{endpoint}", params={'url': url}, timeout=300)
+                    status, hit = response.status_code, response.headers.get('X-Cache')
+                except requests.RequestException:
+                    status, hit = 'error', None
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed)
+                    statuses[status] += 1
+                    cache[hit] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(client) for _ in range(concurrency)]:
+            future.result()
+    return load_result(latencies, time.perf_counter() - started, statuses, cache)
+
+
+def server_stats(server_url):
+    return requests.get(f"{server_url}/stats", timeout=30).json()
+
+
+def cli_runs(urls, profile):
+    runs = []
+    with tempfile.TemporaryDirectory() as directory:
+        for url in urls:
+            started = time.perf_counter()
+            subprocess.run([sys.executable, os.path.abspath(main.__file__), url, '--format', 'json',
+                            '--output', os.path.join(directory, 'result.json'), '--profile', profile],
+                           check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            runs.append(time.perf_counter() - started)
+    return runs
+
+
+def bench_server(args):
+    config = {name: getattr(args, name) for name in SITE_DEFAULTS}
+    rng = random.Random(1)
+    results = {}
+    with local_site(config) as base_url, spawned_server(serve_audits, args.workers, args.profile) as server_url:
+        urls = [f"{base_url}/page/{i}" for i in range(args.unique)]
+        results['cold'] = generate_load(server_url, urls, args.concurrency, args.endpoint)
+
+        before = server_stats(server_url)['analyses']
+        results['burst'] = generate_load(server_url, [f"{base_url}/page/{args.unique}"] * args.concurrency,
+                                         args.concurrency, args.endpoint)
+        results['burst']['analyses'] = server_stats(server_url)['analyses'] - before
+
+        results['warm'] = generate_load(server_url, [rng.choice(urls) for _ in range(args.requests)],
+                                        args.concurrency, args.endpoint)
+        stats = server_stats(server_url)
+
+        if args.cli_runs:
+            runs = cli_runs(urls[:args.cli_runs], args.profile)
+            results['cli'] = {'requests': len(runs), 'seconds': round(sum(runs), 3),
+                              'per_second': round(len(runs) / sum(runs), 1),
+                              'p50_ms': round(statistics.median(runs) * 1000, 1),
+                              'p95_ms': round(percentile(sorted(runs), 0.95) * 1000, 1),
+                              'max_ms': round(max(runs) * 1000, 1), 'errors': 0, 'cache_hits': 0}
+
+    print(f"Audit server under load ({args.endpoint}, {args.profile} profile, {args.concurrency} clients, "
+          f"{args.workers} workers):")
+    for name, result in results.items():
+        print(f"  {name:<6} {result['requests']:5} requests in {result['seconds']:8.2f}s  "
+              f"{result['per_second']:7.1f}/s  p50 {result['p50_ms']:8.1f} ms  p95 {result['p95_ms']:8.1f} ms  "
+              f"max {result['max_ms']:8.1f} ms  {result['cache_hits']:5} cached  {result['errors']} errors")
+    print(f"  (burst: {args.concurrency} concurrent requests for one new URL, {results['burst']['analyses']} "
+          f"analyses run; cli: one main.py process per URL)")
+    print(f"Server: {stats['analyses']} analyses, HTTP {stats['http']['requests']} requests over "
+          f"{stats['http']['connections']} connections, stylesheet cache {stats['css_cache']['hits']} hits, "
+          f"peak RSS {stats['peak_rss_mb']} MB")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as stream:
+            json.dump({'created': datetime.now().isoformat(timespec='seconds'), 'config': {name: value for name, value in vars(args).items() if name != 'func'},
+                       'results': results, 'server': stats}, stream, indent=2)
+        print(f"Results saved to: {args.output}")
+
+
+LAZY_MODULES = ('requests', 'urllib3', 'reportlab', 'bs4', 'aiohttp', 'asyncio', 'multiprocessing', 'http.server',
+                'urllib.robotparser', 'pdf_report', 'async_api', 'offline', 'result_store', 'audit_server')
+
+
+def eagerly_imported(modules=LAZY_MODULES):
+    code = f"import json, sys, main; print(json.dumps([name for name in {list(modules)!r} if name in sys.modules]))"
+    output = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(main.__file__))).stdout
+    return json.loads(output)
+
+
+def bench_startup(args):
+    interpreter = min(command_timings([sys.executable, '-c', 'pass'], args.repeat))
+    imports = min(import_timings(args.repeat))
+    script = min(command_timings([sys.executable, os.path.abspath(main.__file__), '--help'], args.repeat))
+    module = min(command_timings([sys.executable, '-m', 'main', '--help'], args.repeat))
+    print(f"Cold start (best of {args.repeat} fresh processes):")
+    print(f"  {'python -c pass':<28} {interpreter * 1000:8.1f} ms")
+    print(f"  {'import main':<28} {imports * 1000:8.1f} ms  (+{(imports - interpreter) * 1000:.1f} ms)")
+    print(f"  {'main.py --help':<28} {script * 1000:8.1f} ms  (+{(script - interpreter) * 1000:.1f} ms)")
+    print(f"  {'-m main --help':<28} {module * 1000:8.1f} ms  (+{(module - interpreter) * 1000:.1f} ms)")
+
+    failed = False
+    eager = eagerly_imported()
+    if eager:
+        print(f"Imported by 'import main' although only some features need them: {', '.join(eager)}")
+        failed = True
+    if args.budget_ms and (imports - interpreter) * 1000 > args.budget_ms:
+        print(f"'import main' takes longer than the budget of {args.budget_ms} ms")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+def bench_rerun(args):
+    config = {name: getattr(args, name) for name in SITE_DEFAULTS}
+    changed = round(config['pages'] * args.changed / 100)
+    runs = {}
+    with local_site(config) as base_url, tempfile.TemporaryDirectory() as directory:
+        urls = [f"{base_url}/page/{i}" for i in range(config['pages'])]
+        for name in ('no store', 'first run', 're-run'):
+            if name == 're-run' and changed:
+                requests.get(f"{base_url}/_revise/{changed}", timeout=30).raise_for_status()
+            store = main.ResultStore(os.path.join(directory, 'results.db')) if name != 'no store' else None
+            options = fresh_options()
+            writer = main.PdfReportWriter(os.path.join(directory, name.replace(' ', '-')), store=store)
+            with options['session'], contextlib.redirect_stdout(io.StringIO()):
+                summary = main.run_batch(urls, workers=args.workers, per_host=args.workers, writer=writer,
+                                         profile=args.profile, store=store, **options)
+            if store is not None:
+                store.close()
+            if summary['failed']:
+                raise RuntimeError(f"re-audit benchmark failed: {summary['failures'][:3]}")
+            runs[name] = summary
+
+    print(f"Re-audit of {len(urls)} pages with {changed} changed ({args.profile} profile, {args.workers} workers, "
+          f"PDF reports):")
+    baseline = runs['no store']['elapsed']
+    for name, summary in runs.items():
+        line = f"  {name:<10} {summary['elapsed']:8.2f}s  {baseline / summary['elapsed']:5.1f}x"
+        if 'store' in summary:
+            stats = summary['store']
+            line += (f"  {stats['reused']} reused, {stats['changed']} changed, {stats['new']} new, "
+                     f"{stats['reports_reused']} PDF reports reused, {len(stats['changes'])} with changed checks")
+        print(line)
+
+
+def bench_dom(args):
+    html = synthetic_page(args.size)
+    print(f"DOM extraction on a {len(html) / 1024:.0f} KB page (best of {args.repeat}):")
+    baseline = measure(lambda: legacy_dom_scan(html), args.repeat)
+    print(f"  {'bs4 multi-scan (previous)':<28} {baseline * 1000:8.1f} ms")
+    parsers = ['html.parser']
+    if main.HTML_PARSER == 'lxml':
+        parsers.append('lxml')
+    for parser in parsers:
+        elapsed = measure(lambda: main.extract_page_elements(html, parser), args.repeat)
+        print(f"  {'single pass (' + parser + ')':<28} {elapsed * 1000:8.1f} ms  {baseline / elapsed:5.1f}x")
+
+
+def bench_keywords(args):
+    for label, prose in (('few stopwords', False), ('prose-like', True)):
+        text = synthetic_text(args.words, prose=prose)
+        tokens = main.tokenize(text)
+        share = sum(1 for token in tokens if token in main.STOPWORDS) / len(tokens)
+        print(f"Keyword extraction on {args.words} words, {label} ({share:.1%} stopwords, best of {args.repeat}):")
+        for n in (1, 2, 3):
+            baseline = measure(lambda: legacy_extract_keywords(text, n=n), args.repeat)
+            elapsed = measure(lambda: main.extract_keywords(text, n=n), args.repeat)
+            print(f"  {n}-grams: previous {baseline * 1000:8.1f} ms, current {elapsed * 1000:8.1f} ms  "
+                  f"{baseline / elapsed:5.1f}x")
+
+
+def bench_pdf(args):
+    result = sample_result()
+    renderer = ReportRenderer()
+    with tempfile.TemporaryDirectory() as directory:
+        output_file = os.path.join(directory, 'report.pdf')
+        print(f"PDF rendering of one report (best of {args.repeat}):")
+        baseline = measure(lambda: main.generate_pdf(result, output_file, renderer=ReportRenderer()),
+                           args.repeat)
+        print(f"  {'styles built per report':<28} {baseline * 1000:8.1f} ms")
+        elapsed = measure(lambda: main.generate_pdf(result, output_file, renderer=renderer), args.repeat)
+        print(f"  {'shared ReportRenderer':<28} {elapsed * 1000:8.1f} ms  {baseline / elapsed:5.1f}x")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for the SEO analyzer.")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    dom = subparsers.add_parser('dom', help="compare single-pass DOM extraction against the bs4 scans")
+    dom.add_argument('--size', type=int, default=1024, help="page size in KB (default: 1024)")
+    dom.add_argument('--repeat', type=int, default=5, help="runs per variant, best is reported (default: 5)")
+    dom.set_defaults(func=bench_dom)
+
+    keywords = subparsers.add_parser('keywords', help="compare keyword extraction against the previous implementation")
+    keywords.add_argument('--words', type=int, default=100000, help="number of words (default: 100000)")
+    keywords.add_argument('--repeat', type=int, default=5, help="runs per variant, best is reported (default: 5)")
+    keywords.set_defaults(func=bench_keywords)
+
+    pdf = subparsers.add_parser('pdf', help="time PDF report rendering with a fresh and a shared renderer "
+                                            "(the shared one only skips building the styles)")
+    pdf.add_argument('--repeat', type=int, default=20, help="runs per variant, best is reported (default: 20)")
+    pdf.set_defaults(func=bench_pdf)
+
+    suite = subparsers.add_parser('suite', help="benchmark analysis, keywords, PDF rendering and batch throughput "
+                                                "against a synthetic site served locally")
+    suite.add_argument('--repeat', type=int, default=5, help="runs per benchmark (default: 5)")
+    suite.add_argument('--batch-repeat', type=int, default=3, help="runs of the batch benchmark (default: 3)")
+    suite.add_argument('--workers', type=int, default=8, help="batch workers (default: 8)")
+    suite.add_argument('--batch-profile', choices=sorted(main.PROFILES), default=main.DEFAULT_PROFILE,
+                       help=f"audit profile of the batch benchmark (default: {main.DEFAULT_PROFILE})")
+    suite.add_argument('--words', type=int, default=100000, help="words for the keyword benchmark (default: 100000)")
+    for name, default in SITE_DEFAULTS.items():
+        suite.add_argument(f"--{name.replace('_', '-')}", dest=name, type=int, default=default,
+                           help=f"synthetic site: {name.replace('_', ' ')} (default: {default})")
+    suite.add_argument('--output', metavar='FILE', help="save the results as JSON")
+    suite.add_argument('--compare', metavar='FILE', help="compare with results saved by an earlier run")
+    suite.add_argument('--threshold', type=float, default=10.0,
+                       help="slowdown in percent reported as a regression by --compare (default: 10)")
+    suite.set_defaults(func=bench_suite)
+
+    startup = subparsers.add_parser('startup', help="time 'import main' and 'main.py --help' in fresh processes, "
+                                                    "fail when the import gets slow or loads heavy modules up front")
+    startup.add_argument('--repeat', type=int, default=10, help="runs per command, best is reported (default: 10)")
+    startup.add_argument('--budget-ms', type=float, default=100.0,
+                         help="maximum time 'import main' may add to the interpreter startup, 0 disables the check "
+                              "(default: 100)")
+    startup.set_defaults(func=bench_startup)
+
+    rerun = subparsers.add_parser('rerun', help="time a batch audit of the synthetic site without a result store, "
+                                                "then with an empty store and again after some pages changed")
+    rerun.add_argument('--changed', type=float, default=10.0,
+                       help="percentage of pages changed before the re-run (default: 10)")
+    rerun.add_argument('--workers', type=int, default=8, help="batch workers (default: 8)")
+    rerun.add_argument('--profile', choices=sorted(main.PROFILES), default=main.DEFAULT_PROFILE,
+                       help=f"audit profile (default: {main.DEFAULT_PROFILE})")
+    for name, default in SITE_DEFAULTS.items():
+        rerun.add_argument(f"--{name.replace('_', '-')}", dest=name, type=int, default=default,
+                           help=f"synthetic site: {name.replace('_', ' ')} (default: {default})")
+    rerun.set_defaults(func=bench_rerun)
+
+    server = subparsers.add_parser('server', help="measure latency and throughput of the audit server (main.py "
+                                                  "--serve) under load from local clients")
+    server.add_argument('--endpoint', choices=('analyze', 'report'), default='analyze',
+                        help="endpoint requested (default: analyze)")
+    server.add_argument('--profile', choices=sorted(main.PROFILES), default=main.DEFAULT_PROFILE,
+                        help=f"audit profile (default: {main.DEFAULT_PROFILE})")
+    server.add_argument('--concurrency', type=int, default=16, help="concurrent clients (default: 16)")
+    server.add_argument('--workers', type=int, default=8, help="concurrent analyses of the server (default: 8)")
+    server.add_argument('--unique', type=int, default=20, help="distinct URLs audited cold (default: 20)")
+    server.add_argument('--requests', type=int, default=500,
+                        help="requests for the same URLs once their results are cached (default: 500)")
+    server.add_argument('--cli-runs', type=int, default=3,
+                        help="URLs also analyzed by running main.py once per URL, for comparison (default: 3)")
+    for name, default in SITE_DEFAULTS.items():
+        server.add_argument(f"--{name.replace('_', '-')}", dest=name, type=int, default=default,
+                            help=f"synthetic site: {name.replace('_', ' ')} (default: {default})")
+    server.add_argument('--output', metavar='FILE', help="save the results as JSON")
+    server.set_defaults(func=bench_server)
+
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    args.func(args)
@@ -1,834 +1,2758 @@
-import requests
-from bs4 import BeautifulSoup
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
-from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_JUSTIFY
-from urllib.parse import urlparse, urljoin
+from urllib.parse import urlparse, urljoin, urlunparse, urldefrag
+from xml.etree import ElementTree
+import argparse
+import codecs
+import csv
+import gzip
+import hashlib
+import importlib
+import importlib.util
+import io
+import json
+import math
+import os
+import queue
 import re
+import sys
+import threading
+import weakref
 from datetime import datetime
 import time
-from collections import Counter
-from xml.sax.saxutils import escape
+from collections import Counter, OrderedDict, deque
+import concurrent.futures
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field, fields, asdict
+from html.parser import HTMLParser
+from itertools import compress, islice
+from operator import and_
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+class _LazyModule:
+    """Stands in for a module that is imported when one of its attributes is first used."""
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, name):
+        return getattr(importlib.import_module(self._name), name)
+
+
+requests = _LazyModule('requests')
+asyncio = _LazyModule('asyncio')
+multiprocessing = _LazyModule('multiprocessing')
+
+if __name__ == '__main__':
+    # The modules below import this one as 'main'. Run as a script, they get this module instead of a second copy.
+    sys.modules.setdefault('main', sys.modules[__name__])
+
+# The asyncio API, offline input, the result store and the audit server live in their own modules. They are
+# imported on first use, and their names stay available here.
+_SUBMODULES = {
+    'async_api': ('AsyncLimiter', 'get_async_limiter', 'create_async_session', 'AsyncResponse', 'async_fetch',
+                  'check_robots_async', 'check_wp_content_async', 'fetch_with_redirect_check_async',
+                  'check_www_redirect_async', 'check_non_www_redirect_async', 'read_sitemap_async',
+                  'walk_sitemaps_async', 'check_sitemap_async', 'analyze_seo_async'),
+    'offline': ('read_header_block', 'decode_chunked', 'parse_http_response', 'parse_capture_time',
+                'iter_warc_pages', 'iter_har_pages', 'iter_html_file', 'iter_offline_pages', 'analyze_offline_batch',
+                'run_offline'),
+    'result_store': ('RESPONSE_FIELDS', 'StoredAudit', 'ResultStore'),
+    'audit_server': ('AuditService', 'create_audit_server', 'serve'),
+}
+_SUBMODULE_NAMES = {name: module for module, names in _SUBMODULES.items() for name in names}
+
+
+def __getattr__(name):
+    module = _SUBMODULE_NAMES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module), name)
+
+
+PROBE_WORKERS = 8
+BATCH_WORKERS = 8
+PER_HOST_LIMIT = 2
+POOL_SIZE = 20
+HTTP_RETRIES = 2
+SITE_CACHE_SIZE = 1024
+SITE_CACHE_TTL = 3600
+SITE_ERROR_TTL = 60
+HTTP_CACHE_MAX_MB = 512
+MAX_PAGE_MB = 10
+TFIDF_TOP_K = 5
+LINKS_PER_HOST = 4
+LINK_CACHE_SIZE = 100000
+LINK_CACHE_TTL = 3600
+ASSETS_PER_HOST = 6
+ASSET_CACHE_SIZE = 100000
+ASSET_CACHE_TTL = 3600
+CSS_CACHE_SIZE = 10000
+CSS_CACHE_TTL = 3600
+CSS_MAX_MB = 5
+CSS_SAMPLE_BYTES = 16 * 1024
+CSS_MINIFIED_LINE_LENGTH = 200
+ROBOTS_EXCERPT_CHARS = 300
+RENDER_QUEUE_SIZE = 64
+OFFLINE_BATCH_SIZE = 32
+ASYNC_MAX_REQUESTS = 200
+ASYNC_MAX_AUDITS = 1000
+SERVER_PORT = 8000
+RESULT_CACHE_SIZE = 1000
+RESULT_CACHE_TTL = 300
+STORE_MAX_AGE_DAYS = 7
+HTML_EXTENSIONS = ('.html', '.htm')
+CRAWL_MAX_PAGES = 100
+CRAWL_MAX_DEPTH = 3
+CRAWL_MAX_FRONTIER = 10000
+SITEMAP_MAX_FILES = 50
+SITEMAP_WORKERS = 4
+SITEMAP_MAX_MB = 50
+NON_HTML_EXTENSIONS = frozenset([
+    '.7z', '.avi', '.bmp', '.css', '.csv', '.doc', '.docx', '.eot', '.exe', '.gif', '.gz', '.ico', '.jpeg', '.jpg',
+    '.js', '.json', '.mov', '.mp3', '.mp4', '.ogg', '.otf', '.pdf', '.png', '.ppt', '.pptx', '.rar', '.rss', '.svg',
+    '.tar', '.tgz', '.ttf', '.txt', '.wav', '.webm', '.webp', '.woff', '.woff2', '.xls', '.xlsx', '.xml', '.zip',
+])
+STREAM_CHUNK_SIZE = 64 * 1024
+HTML_PARSER = 'lxml' if importlib.util.find_spec('lxml') else 'html.parser'
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+_default_session = None
+_default_session_lock = threading.Lock()
+
+
+_pooled_adapter_class = None
+_pooled_adapter_class_lock = threading.Lock()
+
+
+def pooled_adapter_class():
+    global _pooled_adapter_class
+    with _pooled_adapter_class_lock:
+        if _pooled_adapter_class is not None:
+            return _pooled_adapter_class
+        from requests.adapters import HTTPAdapter
+
+        class PooledAdapter(HTTPAdapter):
+            def __init__(self, *args, **kwargs):
+                self.requests_sent = 0
+                self.connections_opened = 0
+                self._stats_lock = threading.Lock()
+                super().__init__(*args, **kwargs)
+
+            def init_poolmanager(self, *args, **kwargs):
+                super().init_poolmanager(*args, **kwargs)
+                self.poolmanager.pool_classes_by_scheme = {
+                    scheme: self._counting_pool(pool_cls)
+                    for scheme, pool_cls in self.poolmanager.pool_classes_by_scheme.items()
+                }
+
+            def _counting_pool(self, pool_cls):
+                adapter = self
+
+                class CountingConnection(pool_cls.ConnectionCls):
+                    def connect(self):
+                        super().connect()
+                        with adapter._stats_lock:
+                            adapter.connections_opened += 1
+
+                return type(pool_cls.__name__, (pool_cls,), {'ConnectionCls': CountingConnection})
+
+            def send(self, request, **kwargs):
+                stage = getattr(_stage_local, 'call', None)
+                try:
+                    response = super().send(request, **kwargs)
+                except Exception:
+                    if stage is not None:
+                        stage.failed.append(request.url)
+                    raise
+                with self._stats_lock:
+                    self.requests_sent += 1
+                if stage is not None:
+                    stage.responses.append(response.raw)
+                return response
+
+        _pooled_adapter_class = PooledAdapter
+        return PooledAdapter
+
+
+def create_session(pool_size=POOL_SIZE, retries=HTTP_RETRIES, user_agent=USER_AGENT, headers=None):
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    session.headers['User-Agent'] = user_agent
+    if headers:
+        session.headers.update(headers)
+    # Retry-After is ignored: a 503 asking for a day's pause would block the probe and its host slot that long.
+    retry = Retry(total=retries, backoff_factor=0.3, status_forcelist=(502, 503, 504),
+                  allowed_methods=frozenset(['GET', 'HEAD']), raise_on_status=False, respect_retry_after_header=False)
+    adapter = pooled_adapter_class()(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_session():
+    global _default_session
+    with _default_session_lock:
+        if _default_session is None:
+            _default_session = create_session()
+        return _default_session
+
+
+def session_stats(session):
+    requests_made = 0
+    connections = 0
+    for adapter in {id(a): a for a in session.adapters.values()}.values():
+        if isinstance(adapter, pooled_adapter_class()):
+            requests_made += adapter.requests_sent
+            connections += adapter.connections_opened
+    reused = max(requests_made - connections, 0)
+    return {
+        'requests': requests_made,
+        'connections': connections,
+        'reused': reused,
+        'reuse_ratio': round(reused / requests_made, 3) if requests_made else 0.0,
+    }
 
 
-def fetch_page(url, timeout=10):
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    response = requests.get(url, headers=headers, timeout=timeout, allow_redirects=True)
-    response.raise_for_status()
-    return response
+STAGE_FIELDS = ('seconds', 'wall', 'calls', 'requests', 'bytes', 'errors')
+# Only the page fetch counts 4xx/5xx responses as errors. For the probes (robots.txt, sitemaps, redirects,
+# /wp-content/, links, stylesheets and assets) a 404 is the answer they look for, so only failed requests count.
+STATUS_ERROR_STAGES = frozenset(['fetch'])
+_stage_local = threading.local()
+
+
+class _StageCall:
+    __slots__ = ('metrics', 'name', 'started', 'seconds', 'responses', 'received', 'failed', '_previous')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+        self.seconds = None
+        self.responses = []
+        self.received = []
+        self.failed = []
+
+    def __enter__(self):
+        self._previous = getattr(_stage_local, 'call', None)
+        _stage_local.call = self
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _stage_local.call = self._previous
+        self.finish(exc_type)
+
+    def finish(self, exc_type=None):
+        finished = time.perf_counter()
+        statuses = [getattr(raw, 'status', 0) for raw in self.responses] + [status for status, _ in self.received]
+        bytes_read = sum(raw.tell() for raw in self.responses if hasattr(raw, 'tell')) + \
+            sum(size for _, size in self.received)
+        errors = len(self.failed)
+        if self.name in STATUS_ERROR_STAGES:
+            errors += sum(1 for status in statuses if status >= 400)
+        if exc_type is not None and not issubclass(exc_type, (requests.RequestException, asyncio.CancelledError)):
+            errors += 1
+        seconds = self.seconds if self.seconds is not None else finished - self.started
+        self.metrics.record(self.name, self.started, finished, seconds, len(statuses) + len(self.failed),
+                            bytes_read, errors)
+
+
+class StageMetrics:
+    def __init__(self):
+        self.stages = {}
+        self._spans = {}
+        self._lock = threading.Lock()
+
+    def stage(self, name):
+        return _StageCall(self, name)
+
+    def timed(self, name, func, *args):
+        with _StageCall(self, name):
+            return func(*args)
+
+    def record(self, name, started, finished, seconds, requests_made=0, bytes_read=0, errors=0):
+        with self._lock:
+            stage = self.stages.get(name)
+            if stage is None:
+                stage = self.stages[name] = dict.fromkeys(STAGE_FIELDS, 0)
+                self._spans[name] = [started, finished]
+            else:
+                span = self._spans[name]
+                span[0] = min(span[0], started)
+                span[1] = max(span[1], finished)
+            span = self._spans[name]
+            stage['seconds'] += seconds
+            stage['wall'] = span[1] - span[0]
+            stage['calls'] += 1
+            stage['requests'] += requests_made
+            stage['bytes'] += bytes_read
+            stage['errors'] += errors
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(stage, seconds=round(stage['seconds'], 4), wall=round(stage['wall'], 4))
+                    for name, stage in self.stages.items()}
+
+
+def run_in_stage(call, func, *args):
+    _stage_local.call = call
+    try:
+        return func(*args)
+    finally:
+        _stage_local.call = None
+
+
+def stage_record(seconds, requests_made=0, bytes_read=0, errors=0):
+    return {'seconds': round(seconds, 4), 'wall': round(seconds, 4), 'calls': 1, 'requests': requests_made,
+            'bytes': bytes_read, 'errors': errors}
+
+
+class MetricsLog:
+    def __init__(self, path=None):
+        self.path = path
+        self.totals = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, url, stages):
+        with self._lock:
+            for name, stage in stages.items():
+                total = self.totals.setdefault(name, dict.fromkeys(STAGE_FIELDS, 0))
+                for key in STAGE_FIELDS:
+                    total[key] += stage[key]
+            if self.path:
+                with open(self.path, 'a', encoding='utf-8') as stream:
+                    stream.write(json.dumps({'url': url, 'time': round(time.time(), 3), 'stages': stages}) + '\n')
+
+    def stats(self):
+        with self._lock:
+            return {name: dict(total, seconds=round(total['seconds'], 3), wall=round(total['wall'], 3))
+                    for name, total in self.totals.items()}
 
 
-def fetch_with_redirect_check(base_url, variant):
+def notify_metrics(hook, url, stages):
+    if hook is None:
+        return
+    try:
+        hook(url, stages)
+    except Exception as e:
+        print(f"[metrics hook failed] {url}: {str(e)}")
+
+
+class Transient:
+    # Wraps a computed value that stems from a timeout, connection error or 5xx response; TTLCache keeps it
+    # only for error_ttl seconds instead of ttl.
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+
+class TTLCache:
+    _MISSING = object()
+
+    def __init__(self, maxsize=SITE_CACHE_SIZE, ttl=SITE_CACHE_TTL, error_ttl=SITE_ERROR_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._inflight = {}
+        self._async_inflight = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return self._MISSING
+        expires, value = item
+        if expires <= time.monotonic():
+            del self._data[key]
+            return self._MISSING
+        self._data.move_to_end(key)
+        return value
+
+    def _store(self, key, value):
+        ttl = self.ttl
+        if isinstance(value, Transient):
+            value, ttl = value.value, min(self.error_ttl, self.ttl)
+        if self.maxsize <= 0:
+            return value
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+        return value
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._lookup(key)
+            if value is self._MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._store(key, value)
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            value = self._lookup(key)
+            if value is not self._MISSING:
+                self.hits += 1
+                return value
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+                self.misses += 1
+            else:
+                self.hits += 1
+        if not owner:
+            return future.result()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            value = self._store(key, value)
+            self._inflight.pop(key, None)
+        future.set_result(value)
+        return value
+
+    async def get_or_compute_async(self, key, compute):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            value = self._lookup(key)
+            if value is not self._MISSING:
+                self.hits += 1
+                return value
+            entry = self._async_inflight.get(key)
+            if entry is None or entry[0].get_loop() is not loop:
+                entry = self._async_inflight[key] = [None, 0]
+                entry[0] = loop.create_task(self._compute_async(key, compute, entry))
+                self.misses += 1
+            else:
+                self.hits += 1
+            entry[1] += 1
+        task = entry[0]
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # The computation is shared by every waiter; it is cancelled with the last one that leaves.
+            with self._lock:
+                entry[1] -= 1
+                last = entry[1] == 0
+            if last and not task.done():
+                task.cancel()
+                await asyncio.wait([task])
+            raise
+        else:
+            with self._lock:
+                entry[1] -= 1
+
+    async def _compute_async(self, key, compute, entry):
+        try:
+            value = await compute()
+        except BaseException:
+            with self._lock:
+                if self._async_inflight.get(key) is entry:
+                    del self._async_inflight[key]
+            raise
+        with self._lock:
+            value = self._store(key, value)
+            if self._async_inflight.get(key) is entry:
+                del self._async_inflight[key]
+        return value
+
+    def discard(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._data)}
+
+
+site_cache = TTLCache()
+
+
+def site_root(url):
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc.lower()}/"
+
+
+def site_fact(cache, url, name, probe, *args):
+    root = site_root(url)
+    return cache.get_or_compute((root, name), lambda: probe(root, *args))
+
+
+class HTTPCache:
+    def __init__(self, directory, max_bytes=HTTP_CACHE_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.revalidated = 0
+        self.misses = 0
+        self.stored = 0
+        self._lock = threading.Lock()
+        self._index = OrderedDict()
+        self._total = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.body'):
+                continue
+            key = name[:-5]
+            try:
+                size = self._entry_size(key)
+                atime = os.stat(os.path.join(self.directory, name)).st_mtime
+            except OSError:
+                continue
+            entries.append((atime, key, size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total += size
+
+    def _paths(self, key):
+        base = os.path.join(self.directory, key)
+        return base + '.json', base + '.body'
+
+    def _entry_size(self, key):
+        return sum(os.path.getsize(path) for path in self._paths(key))
+
+    def _key(self, url):
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _load(self, key):
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+            os.utime(body_path)
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            if key in self._index:
+                self._index.move_to_end(key)
+        return meta, body
+
+    def _store(self, key, response):
+        meta = {
+            'url': response.url,
+            'status': response.status_code,
+            'encoding': response.encoding,
+            'headers': dict(response.headers),
+        }
+        meta_path, body_path = self._paths(key)
+        suffix = f".{threading.get_ident()}.tmp"
+        try:
+            with open(body_path + suffix, 'wb') as f:
+                f.write(response.content)
+            with open(meta_path + suffix, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.replace(body_path + suffix, body_path)
+            os.replace(meta_path + suffix, meta_path)
+            size = self._entry_size(key)
+        except OSError:
+            return
+        with self._lock:
+            self._total += size - self._index.pop(key, 0)
+            self._index[key] = size
+            self.stored += 1
+            evicted = []
+            while self._total > self.max_bytes and self._index:
+                old_key, old_size = self._index.popitem(last=False)
+                self._total -= old_size
+                evicted.append(old_key)
+        for old_key in evicted:
+            for path in self._paths(old_key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _from_cache(self, meta, body, revalidation):
+        response = requests.Response()
+        response.status_code = meta['status']
+        response.reason = 'OK'
+        response.url = meta['url']
+        response.encoding = meta['encoding']
+        response.headers = requests.structures.CaseInsensitiveDict(meta['headers'])
+        for header in ('Date', 'Expires', 'Cache-Control', 'ETag', 'Last-Modified'):
+            if header in revalidation.headers:
+                response.headers[header] = revalidation.headers[header]
+        response._content = body
+        response.request = revalidation.request
+        response.elapsed = revalidation.elapsed
+        response.from_cache = True
+        return response
+
+    def get(self, url, session=None, timeout=10, max_bytes=None):
+        session = session or get_session()
+        key = self._key(url)
+        cached = self._load(key)
+        headers = {}
+        if cached:
+            meta_headers = requests.structures.CaseInsensitiveDict(cached[0]['headers'])
+            if meta_headers.get('ETag'):
+                headers['If-None-Match'] = meta_headers['ETag']
+            if meta_headers.get('Last-Modified'):
+                headers['If-Modified-Since'] = meta_headers['Last-Modified']
+
+        response = session.get(url, headers=headers, timeout=timeout, allow_redirects=True,
+                               stream=max_bytes is not None)
+        if max_bytes is not None:
+            response._content, response.truncated = read_limited(response, max_bytes)
+        if response.status_code == 304 and cached:
+            with self._lock:
+                self.revalidated += 1
+            return self._from_cache(cached[0], cached[1], response)
+
+        with self._lock:
+            self.misses += 1
+        cacheable = 'ETag' in response.headers or 'Last-Modified' in response.headers
+        if response.status_code == 200 and cacheable and not getattr(response, 'truncated', False):
+            self._store(key, response)
+        return response
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.revalidated,
+                'misses': self.misses,
+                'size': len(self._index),
+                'bytes': self._total,
+            }
+
+
+def http_get(url, session=None, timeout=10, http_cache=None):
+    if http_cache is not None:
+        return http_cache.get(url, session=session, timeout=timeout)
+    session = session or get_session()
+    return session.get(url, timeout=timeout, allow_redirects=True)
+
+
+def read_limited(response, max_bytes, chunk_size=STREAM_CHUNK_SIZE):
+    chunks = []
+    size = 0
+    truncated = False
+    try:
+        for chunk in response.iter_content(chunk_size):
+            if size + len(chunk) > max_bytes:
+                chunks.append(chunk[:max_bytes - size])
+                truncated = True
+                break
+            chunks.append(chunk)
+            size += len(chunk)
+    finally:
+        response.close()
+    return b''.join(chunks), truncated
+
+
+_CHARSET_RE = re.compile(r'charset=["\']?([\w.:-]+)', re.I)
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset=["\']?([\w.:-]+)', re.I)
+
+
+def detect_html_encoding(headers, head):
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    candidates = []
+    match = _CHARSET_RE.search(headers.get('Content-Type', ''))
+    if match:
+        candidates.append(match.group(1))
+    match = _META_CHARSET_RE.search(head[:4096])
+    if match:
+        candidates.append(match.group(1).decode('ascii'))
+    for encoding in candidates:
+        try:
+            return codecs.lookup(encoding).name
+        except LookupError:
+            continue
+    return 'utf-8'
+
+
+def _feed_page_parser(chunks, headers, page_parser, max_bytes, digest=None):
+    decoder = None
+    size = 0
+    truncated = False
+    read_time = 0.0
+    chunks = iter(chunks)
+    while not truncated:
+        started = time.perf_counter()
+        chunk = next(chunks, None)
+        read_time += time.perf_counter() - started
+        if chunk is None:
+            break
+        if not chunk:
+            continue
+        if size + len(chunk) > max_bytes:
+            chunk = chunk[:max_bytes - size]
+            truncated = True
+        size += len(chunk)
+        if digest is not None:
+            digest.update(chunk)
+        if decoder is None:
+            decoder = codecs.getincrementaldecoder(detect_html_encoding(headers, bytes(chunk[:4096])))('replace')
+        page_parser.feed(decoder.decode(chunk))
+    if decoder is not None:
+        page_parser.feed(decoder.decode(b'', True))
+    return size, truncated, read_time
+
+
+def fetch_page_elements(url, session=None, timeout=10, max_bytes=MAX_PAGE_MB * 1024 * 1024, parser=None,
+                        http_cache=None, digest=None):
+    page_parser = create_page_parser(parser)
+    started = time.perf_counter()
+    if http_cache is not None:
+        response = http_cache.get(url, session=session, timeout=timeout, max_bytes=max_bytes)
+        response.raise_for_status()
+        header_time = time.perf_counter() - started
+        body = memoryview(response.content)
+        chunks = (body[i:i + STREAM_CHUNK_SIZE] for i in range(0, len(body), STREAM_CHUNK_SIZE))
+        size, truncated, read_time = _feed_page_parser(chunks, response.headers, page_parser, max_bytes, digest)
+        truncated = truncated or getattr(response, 'truncated', False)
+        del chunks, body
+        response._content = b''
+    else:
+        session = session or get_session()
+        response = session.get(url, timeout=timeout, allow_redirects=True, stream=True)
+        try:
+            response.raise_for_status()
+            header_time = time.perf_counter() - started
+            chunks = response.iter_content(STREAM_CHUNK_SIZE)
+            size, truncated, read_time = _feed_page_parser(chunks, response.headers, page_parser, max_bytes,
+                                                           digest)
+        finally:
+            response.close()
+    page = page_parser.close()
+    return response, page, size, truncated, header_time + read_time
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+def fetch_with_redirect_check(base_url, variant, session=None):
     test_url = base_url.replace('https://', f'https://{variant}.') if variant else base_url.replace('https://', 'http://')
+    session = session or get_session()
     try:
-        resp = fetch_page(test_url, timeout=5)
+        resp = session.get(test_url, timeout=5, allow_redirects=True, stream=True)
+        resp.close()
+        resp.raise_for_status()
         final_url = resp.url
         return final_url == base_url
     except:
         return False
 
 
-def extract_keywords(text, n=1, top_k=10):
-    text = re.sub(r'[^\w\s]', '', text.lower())
-    words = text.split()
-    if n == 1:
-        counter = Counter(words)
-    else:
-        ngrams = [' '.join(words[i:i + n]) for i in range(len(words) - n + 1)]
-        counter = Counter(ngrams)
-    return counter.most_common(top_k)
+STOPWORDS = frozenset('''
+a about above after again against all also am an and any are aren arent as at be because been before being below
+between both but by can cannot cant could couldnt did didnt do does doesnt doing dont down during each few for from
+further get got had hadnt has hasnt have havent having he hed hell hes her here heres hers herself him himself his
+how hows i id ill im ive if in into is isnt it its itself just lets may me might more most mustnt my myself no nor
+not now of off on once one only or other ought our ours ourselves out over own same shant she shed shell shes should
+shouldnt so some such than that thats the their theirs them themselves then there theres these they theyd theyll
+theyre theyve this those through to too under until up us very was wasnt we wed well were weve werent what whats
+when whens where wheres which while who whos whom why whys will with wont would wouldnt you youd youll youre youve
+your yours yourself yourselves
+'''.split())
 
+_PUNCTUATION_RE = re.compile(r'[^\w\s]')
+_ASCII_PUNCTUATION = {code: None for code in range(128) if _PUNCTUATION_RE.match(chr(code))}
 
-def check_broken_links(soup, base_url, sample_size=10):
-    links = [urljoin(base_url, a['href']) for a in soup.find_all('a', href=True) if
-             urlparse(urljoin(base_url, a['href'])).netloc == urlparse(base_url).netloc][:sample_size]
-    broken = 0
-    for link in links:
-        try:
-            resp = requests.head(link, timeout=5, allow_redirects=True)
-            if resp.status_code >= 400:
-                broken += 1
-        except:
-            broken += 1
-    return broken, len(links)
 
+def tokenize(text):
+    text = text.lower()
+    if text.isascii():
+        return text.translate(_ASCII_PUNCTUATION).split()
+    return _PUNCTUATION_RE.sub('', text).split()
 
-def check_image_expires(image_url):
-    try:
-        resp = requests.head(image_url, timeout=5)
-        expires = resp.headers.get('Expires')
-        cache_control = resp.headers.get('Cache-Control', '').lower()
-        return bool(expires or 'max-age' in cache_control)
-    except:
-        return False
 
+def is_keyword(token, stopwords=STOPWORDS):
+    return len(token) > 1 and token not in stopwords and not token.isdigit()
 
-def check_css_media_queries(css_url):
-    try:
-        resp = fetch_page(css_url)
-        css_text = resp.text
-        return '@media' in css_text
-    except:
-        return False
 
+def count_terms(tokens, n=1, stopwords=STOPWORDS):
+    if n == 1:
+        counts = Counter(tokens)
+        for term in [token for token in counts if not is_keyword(token, stopwords)]:
+            del counts[term]
+        return counts
+    # A gram must start and end with a keyword. Positions are checked first, so no tuple is kept for rejected grams.
+    keywords = {token for token in set(tokens) if is_keyword(token, stopwords)}
+    flags = list(map(keywords.__contains__, tokens))
+    grams = zip(*(islice(tokens, i, None) for i in range(n)))
+    return Counter(compress(grams, map(and_, flags, islice(flags, n - 1, None))))
+
+
+def extract_keywords(text, n=1, top_k=10, stopwords=STOPWORDS):
+    counter = count_terms(tokenize(text), n, stopwords)
+    if n == 1:
+        return counter.most_common(top_k)
+    return [(' '.join(gram), count) for gram, count in counter.most_common(top_k)]
+
+
+class KeywordCorpus:
+    def __init__(self, terms_per_document=50):
+        self.terms_per_document = terms_per_document
+        self.documents = 0
+        self.document_frequency = Counter()
+        self._term_frequencies = {}
+        self._lock = threading.Lock()
+
+    def add(self, document_id, counts):
+        total = sum(counts.values())
+        if not total:
+            return
+        top_terms = [(term, count / total) for term, count in counts.most_common(self.terms_per_document)]
+        with self._lock:
+            self.documents += 1
+            self.document_frequency.update(counts.keys())
+            self._term_frequencies[document_id] = top_terms
+
+    def idf(self, term):
+        return math.log((1 + self.documents) / (1 + self.document_frequency[term])) + 1
+
+    def top_terms(self, document_id, top_k=10):
+        with self._lock:
+            terms = self._term_frequencies.get(document_id, [])
+            scored = [(term, tf * self.idf(term)) for term, tf in terms]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return [(term, round(score, 4)) for term, score in scored[:top_k]]
+
+    def scores(self, top_k=10):
+        with self._lock:
+            document_ids = list(self._term_frequencies)
+        return {document_id: self.top_terms(document_id, top_k) for document_id in document_ids}
+
+
+class PageElements:
+    __slots__ = ('title', 'meta_description', 'canonical', 'has_noindex', 'og_tags', 'has_schema', 'h1', 'h2',
+                 'images', 'links', 'stylesheets', 'inline_styles', 'scripts', 'text',
+                 '_pending', '_captures', '_skip_depth', '_style')
+
+    SKIP_TEXT = frozenset(['script', 'style', 'template'])
+    CAPTURE = frozenset(['title', 'h1', 'h2'])
+
+    def __init__(self):
+        self.title = None
+        self.meta_description = None
+        self.canonical = None
+        self.has_noindex = False
+        self.og_tags = 0
+        self.has_schema = False
+        self.h1 = []
+        self.h2 = []
+        self.images = []
+        self.links = []
+        self.stylesheets = []
+        self.inline_styles = []
+        self.scripts = []
+        self.text = []
+        self._pending = []
+        self._captures = []
+        self._skip_depth = 0
+        self._style = None
+
+    @property
+    def content_text(self):
+        return ' '.join(self.text)
+
+    def _flush(self):
+        if self._pending:
+            chunk = ''.join(self._pending).strip()
+            self._pending = []
+            if chunk:
+                self.text.append(chunk)
+
+    def start(self, tag, attrs):
+        self._flush()
+        if tag in self.SKIP_TEXT:
+            self._skip_depth += 1
+            if tag == 'script':
+                if attrs.get('src') is not None:
+                    self.scripts.append(attrs['src'])
+                if attrs.get('type') == 'application/ld+json':
+                    self.has_schema = True
+            elif tag == 'style':
+                self._style = []
+        elif tag == 'a':
+            href = attrs.get('href')
+            if href is not None:
+                self.links.append(href)
+        elif tag == 'img':
+            self.images.append((attrs.get('src', ''), attrs.get('alt', '')))
+        elif tag == 'meta':
+            name = attrs.get('name')
+            if name == 'description':
+                if self.meta_description is None:
+                    self.meta_description = attrs.get('content', '').strip()
+            elif name == 'robots':
+                if 'noindex' in attrs.get('content', '').lower():
+                    self.has_noindex = True
+            if attrs.get('property', '').startswith('og:'):
+                self.og_tags += 1
+        elif tag == 'link':
+            rel = attrs.get('rel', '').split()
+            if 'stylesheet' in rel:
+                self.stylesheets.append(attrs.get('href', ''))
+            if 'canonical' in rel and self.canonical is None:
+                self.canonical = attrs.get('href', '')
+        if tag in self.CAPTURE:
+            self._captures.append((tag, []))
+
+    def end(self, tag):
+        self._flush()
+        if tag in self.SKIP_TEXT:
+            self._skip_depth = max(self._skip_depth - 1, 0)
+            if tag == 'style' and self._style is not None:
+                self.inline_styles.append(''.join(self._style))
+                self._style = None
+        elif tag in self.CAPTURE:
+            for index in range(len(self._captures) - 1, -1, -1):
+                if self._captures[index][0] == tag:
+                    self._finish_capture(*self._captures.pop(index))
+                    break
+
+    def data(self, data):
+        if self._style is not None:
+            self._style.append(data)
+        if self._skip_depth:
+            return
+        self._pending.append(data)
+        for _, parts in self._captures:
+            parts.append(data)
+
+    def comment(self, text):
+        self._flush()
+
+    def _finish_capture(self, tag, parts):
+        text = ''.join(parts).strip()
+        if tag == 'h1':
+            self.h1.append(text)
+        elif tag == 'h2':
+            self.h2.append(text)
+        elif self.title is None:
+            self.title = text
+
+    def close(self):
+        self._flush()
+        while self._captures:
+            self._finish_capture(*self._captures.pop())
+        return self
+
+
+class _StdlibPageParser(HTMLParser):
+    def __init__(self, elements):
+        super().__init__(convert_charrefs=True)
+        self.elements = elements
+
+    def handle_starttag(self, tag, attrs):
+        self.elements.start(tag, {name: value if value is not None else '' for name, value in attrs})
+
+    def handle_endtag(self, tag):
+        self.elements.end(tag)
+
+    def handle_data(self, data):
+        self.elements.data(data)
+
+    def handle_comment(self, data):
+        self.elements.comment(data)
+
+    def handle_decl(self, decl):
+        self.elements.comment(decl)
+
+    def handle_pi(self, data):
+        self.elements.comment(data)
+
+    def close(self):
+        super().close()
+        return self.elements.close()
+
+
+class _LxmlPageParser:
+    def __init__(self, elements):
+        from lxml import etree
+        self.elements = elements
+        self._parser = etree.HTMLParser(target=elements)
+        self._fed = False
+
+    def feed(self, data):
+        self._fed = True
+        self._parser.feed(data)
+
+    def close(self):
+        if not self._fed:
+            return self.elements.close()
+        return self._parser.close()
+
+
+def create_page_parser(parser=None):
+    elements = PageElements()
+    if (parser or HTML_PARSER) == 'lxml':
+        return _LxmlPageParser(elements)
+    return _StdlibPageParser(elements)
+
+
+def extract_page_elements(html, parser=None):
+    page_parser = create_page_parser(parser)
+    page_parser.feed(html)
+    return page_parser.close()
+
+
+class HostLimiter:
+    def __init__(self, per_host):
+        self.per_host = per_host
+        self._semaphores = {}
+        self._async_semaphores = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def __call__(self, url):
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = self._semaphores[host] = threading.BoundedSemaphore(max(1, self.per_host))
+            return semaphore
+
+    def async_semaphore(self, url):
+        host = urlparse(url).netloc.lower()
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphores = self._async_semaphores.get(loop)
+            if semaphores is None:
+                semaphores = self._async_semaphores[loop] = {}
+            semaphore = semaphores.get(host)
+            if semaphore is None:
+                semaphore = semaphores[host] = asyncio.Semaphore(max(1, self.per_host))
+            return semaphore
+
+
+class LinkChecker:
+    def __init__(self, per_host=LINKS_PER_HOST, cache=None, timeout=5):
+        self.timeout = timeout
+        self.cache = cache if cache is not None else TTLCache(maxsize=LINK_CACHE_SIZE, ttl=LINK_CACHE_TTL)
+        self._host_limit = HostLimiter(per_host)
+
+    @property
+    def per_host(self):
+        return self._host_limit.per_host
+
+    @per_host.setter
+    def per_host(self, value):
+        self._host_limit.per_host = value
+
+    def _request(self, session, method, url):
+        if method == 'HEAD':
+            return session.head(url, timeout=self.timeout, allow_redirects=True)
+        response = session.get(url, timeout=self.timeout, allow_redirects=True, stream=True)
+        response.close()
+        return response
+
+    def _probe(self, url, session):
+        result = {'url': url, 'status': None, 'ok': False, 'method': 'HEAD', 'error': None}
+        with self._host_limit(url):
+            for method in ('HEAD', 'GET'):
+                result['method'] = method
+                try:
+                    response = self._request(session, method, url)
+                except requests.Timeout as e:
+                    result['error'] = str(e)
+                    break
+                except requests.RequestException as e:
+                    result['error'] = str(e)
+                    continue
+                result['status'] = response.status_code
+                result['error'] = None
+                if response.status_code < 400:
+                    break
+        result['ok'] = result['status'] is not None and result['status'] < 400
+        return result
+
+    def check(self, url, session=None):
+        session = session or get_session()
+        return self.cache.get_or_compute(url, lambda: self._probe(url, session))
+
+    async def _probe_async(self, url, session, limiter):
+        from async_api import async_fetch
+
+        result = {'url': url, 'status': None, 'ok': False, 'method': 'HEAD', 'error': None}
+        async with self._host_limit.async_semaphore(url):
+            for method in ('HEAD', 'GET'):
+                result['method'] = method
+                try:
+                    response = await async_fetch(session, url, method, limiter, timeout=self.timeout, read=False)
+                except asyncio.TimeoutError:
+                    result['error'] = f"timed out after {self.timeout}s"
+                    break
+                except _aiohttp().ClientError as e:
+                    result['error'] = str(e)
+                    continue
+                result['status'] = response.status
+                result['error'] = None
+                if response.status < 400:
+                    break
+        result['ok'] = result['status'] is not None and result['status'] < 400
+        return result
+
+    async def check_async(self, url, session, limiter=None):
+        return await self.cache.get_or_compute_async(url, lambda: self._probe_async(url, session, limiter))
+
+
+link_checker = LinkChecker()
+
+
+def link_targets(links, max_links=None):
+    targets = []
+    for link in links:
+        link = urldefrag(link)[0]
+        if urlparse(link).scheme in ('http', 'https'):
+            targets.append(link)
+    targets = sorted(set(targets))
+    return targets[:max_links] if max_links is not None else targets
 
-def check_last_modified(response):
-    last_mod = response.headers.get('Last-Modified')
-    if last_mod:
-        try:
-            dt = datetime.strptime(last_mod, '%a, %d %b %Y %H:%M:%S GMT')
-            days_ago = (datetime.now() - dt).days
-            return days_ago <= 30, days_ago
-        except:
-            pass
-    return False, 0
 
+def has_cache_headers(headers):
+    cache_control = headers.get('Cache-Control', '').lower()
+    if 'no-store' in cache_control or 'no-cache' in cache_control:
+        return False
+    return bool(headers.get('Expires') or 'max-age' in cache_control)
 
-def check_sitemap(url):
-    sitemap_url = urljoin(url, '/sitemap.xml')
-    try:
-        resp = requests.get(sitemap_url, timeout=5)
-        return resp.status_code == 200, len(BeautifulSoup(resp.text, 'xml').find_all('loc')) if resp.status_code == 200 else 0
-    except:
-        return False, 0
 
+class AssetAuditor:
+    def __init__(self, per_host=ASSETS_PER_HOST, cache=None, timeout=5):
+        self.timeout = timeout
+        self.cache = cache if cache is not None else TTLCache(maxsize=ASSET_CACHE_SIZE, ttl=ASSET_CACHE_TTL)
+        self._host_limit = HostLimiter(per_host)
 
-def parse_robots(robots_content):
-    disallows = re.findall(r'Disallow:\s*(.+)', robots_content, re.I)
-    return len(disallows) > 0
+    @property
+    def per_host(self):
+        return self._host_limit.per_host
 
+    @per_host.setter
+    def per_host(self, value):
+        self._host_limit.per_host = value
 
-def analyze_seo(url):
-    try:
-        start_time = time.time()
-        response = fetch_page(url)
-        response_time = time.time() - start_time
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        title = soup.find('title')
-        title_text = title.get_text().strip() if title else ""
-        title_length = len(title_text)
-
-        meta_desc = soup.find('meta', attrs={'name': 'description'})
-        meta_desc_text = meta_desc.get('content', '').strip() if meta_desc else ""
-        meta_desc_length = len(meta_desc_text)
-
-        h1_tags = soup.find_all('h1')
-        h1_texts = [h1.get_text().strip() for h1 in h1_tags]
-
-        h2_tags = soup.find_all('h2')
-        h2_texts = [h2.get_text().strip() for h2 in h2_tags]
-
-        images = soup.find_all('img')
-        images_without_alt = [img.get('src', '') for img in images if not img.get('alt')]
-
-        internal_links = set()
-        external_links = set()
-        for link in soup.find_all('a', href=True):
-            href = link['href']
-            absolute_url = urljoin(url, href)
-            parsed = urlparse(absolute_url)
-            if parsed.netloc == urlparse(url).netloc:
-                internal_links.add(absolute_url)
-            else:
-                external_links.add(absolute_url)
+    def _probe(self, url, session):
+        result = {'url': url, 'status': None, 'bytes': None, 'cached': False, 'cache_control': None,
+                  'expires': None, 'compressed': False, 'error': None}
+        try:
+            with self._host_limit(url):
+                response = session.head(url, timeout=self.timeout, allow_redirects=True)
+        except requests.RequestException as e:
+            result['error'] = str(e)
+            return result
+        result['status'] = response.status_code
+        result['bytes'] = content_length(response)
+        result['cached'] = has_cache_headers(response.headers)
+        result['cache_control'] = response.headers.get('Cache-Control')
+        result['expires'] = response.headers.get('Expires')
+        result['compressed'] = 'Content-Encoding' in response.headers
+        return result
+
+    def check(self, url, session=None):
+        session = session or get_session()
+        return self.cache.get_or_compute(url, lambda: self._probe(url, session))
+
+    async def _probe_async(self, url, session, limiter):
+        result = {'url': url, 'status': None, 'bytes': None, 'cached': False, 'cache_control': None,
+                  'expires': None, 'compressed': False, 'error': None}
+        from async_api import async_fetch
 
-        content_text = soup.get_text(separator=' ', strip=True)
-        common_keywords = extract_keywords(content_text, n=1, top_k=10)
-        common_keywords_str = ''.join([kw[0] for kw in common_keywords[:10]])
+        try:
+            async with self._host_limit.async_semaphore(url):
+                response = await async_fetch(session, url, 'HEAD', limiter, timeout=self.timeout)
+        except (asyncio.TimeoutError, _aiohttp().ClientError) as e:
+            result['error'] = str(e) or f"timed out after {self.timeout}s"
+            return result
+        result['status'] = response.status
+        result['bytes'] = content_length(response)
+        result['cached'] = has_cache_headers(response.headers)
+        result['cache_control'] = response.headers.get('Cache-Control')
+        result['expires'] = response.headers.get('Expires')
+        result['compressed'] = 'Content-Encoding' in response.headers
+        return result
+
+    async def check_async(self, url, session, limiter=None):
+        return await self.cache.get_or_compute_async(url, lambda: self._probe_async(url, session, limiter))
+
+
+asset_auditor = AssetAuditor()
+
+
+def asset_targets(base_url, images=(), scripts=(), stylesheets=()):
+    targets = {}
+    for kind, sources in (('image', images), ('script', scripts), ('stylesheet', stylesheets)):
+        for src in sources:
+            if not src:
+                continue
+            asset_url = urldefrag(urljoin(base_url, src))[0]
+            if urlparse(asset_url).scheme in ('http', 'https'):
+                targets.setdefault(asset_url, kind)
+    return targets
+
+
+def summarize_assets(results, html_bytes, top=5):
+    known = [result for result in results if result['bytes'] is not None]
+    heaviest = sorted(known, key=lambda result: result['bytes'], reverse=True)[:top]
+    return {
+        'page_weight': html_bytes + sum(result['bytes'] for result in known),
+        'unknown_size': len(results) - len(known),
+        'heaviest': [(result['url'], result['bytes']) for result in heaviest],
+        'uncached': [result['url'] for result in results if result['status'] == 200 and not result['cached']],
+    }
 
-        title_keywords = set(re.findall(r'\b\w+\b', title_text.lower()))
-        desc_keywords = set(re.findall(r'\b\w+\b', meta_desc_text.lower()))
-        common_keywords_title_desc = list(title_keywords.intersection(desc_keywords))[:5]
 
-        top_keywords = [kw[0] for kw in common_keywords[:5]]
-        keyword_usage = {}
-        headings_text = ' '.join(h1_texts + h2_texts)
-        for kw in top_keywords:
-            in_title = kw in title_text.lower()
-            in_desc = kw in meta_desc_text.lower()
-            in_headings = kw in headings_text.lower()
-            keyword_usage[kw] = {'title': in_title, 'description': in_desc, 'headings': in_headings}
+def content_length(response):
+    try:
+        return int(response.headers['Content-Length'])
+    except (KeyError, ValueError):
+        return None
+
+
+def decoded_length(response):
+    # Content-Length counts the bytes on the wire, which are the decoded bytes only without a Content-Encoding.
+    if response.headers.get('Content-Encoding', 'identity').strip().lower() not in ('', 'identity'):
+        return None
+    return content_length(response)
+
+
+def css_is_minified(css):
+    css = css.strip()
+    if not css:
+        return None
+    lines = css.count('\n') + 1
+    return lines == 1 or len(css) / lines >= CSS_MINIFIED_LINE_LENGTH
+
+
+# The size is that of the decoded body, so compressed, uncompressed, cached and inline CSS compare alike. With a
+# known_size the scan stops once @media is found and the minification sample is taken.
+def scan_css(chunks, known_size=None, max_bytes=CSS_MAX_MB * 1024 * 1024, sample_bytes=CSS_SAMPLE_BYTES):
+    decoder = codecs.getincrementaldecoder('utf-8')('replace')
+    sample = []
+    sampled = 0
+    tail = ''
+    has_media = False
+    size = 0
+    for chunk in chunks:
+        size += len(chunk)
+        text = decoder.decode(chunk)
+        if sampled < sample_bytes:
+            sample.append(text[:sample_bytes - sampled])
+            sampled += len(sample[-1])
+        if not has_media:
+            has_media = '@media' in (tail + text).lower()
+            tail = text[-5:]
+        if has_media and sampled >= sample_bytes and known_size is not None:
+            break
+        if size >= max_bytes:
+            break
+    return known_size if known_size is not None else size, has_media, css_is_minified(''.join(sample))
+
+
+class StylesheetAnalyzer:
+    def __init__(self, cache=None, timeout=5, max_bytes=CSS_MAX_MB * 1024 * 1024):
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.cache = cache if cache is not None else TTLCache(maxsize=CSS_CACHE_SIZE, ttl=CSS_CACHE_TTL)
+
+    def _fetch(self, url, session, http_cache):
+        result = {'url': url, 'bytes': 0, 'has_media_queries': False, 'minified': None, 'error': None}
+        try:
+            if http_cache is not None:
+                response = http_cache.get(url, session=session, timeout=self.timeout, max_bytes=self.max_bytes)
+                chunks, known_size = [response.content], None
+            else:
+                response = session.get(url, timeout=self.timeout, allow_redirects=True, stream=True)
+                chunks, known_size = response.iter_content(STREAM_CHUNK_SIZE), decoded_length(response)
+            try:
+                response.raise_for_status()
+                result['bytes'], result['has_media_queries'], result['minified'] = scan_css(
+                    chunks, known_size, self.max_bytes)
+            finally:
+                response.close()
+        except requests.RequestException as e:
+            result['error'] = str(e)
+        return result
+
+    def check(self, url, session=None, http_cache=None):
+        session = session or get_session()
+        return self.cache.get_or_compute(url, lambda: self._fetch(url, session, http_cache))
+
+    async def _fetch_async(self, url, session, limiter):
+        from async_api import async_fetch
+
+        result = {'url': url, 'bytes': 0, 'has_media_queries': False, 'minified': None, 'error': None}
+        try:
+            response = await async_fetch(session, url, 'GET', limiter, timeout=self.timeout, max_bytes=self.max_bytes)
+            if response.status >= 400:
+                result['error'] = f"{response.status} error for url: {url}"
+                return result
+            result['bytes'], result['has_media_queries'], result['minified'] = scan_css(
+                [response.content], max_bytes=self.max_bytes)
+        except (asyncio.TimeoutError, _aiohttp().ClientError) as e:
+            result['error'] = str(e) or f"timed out after {self.timeout}s"
+        return result
 
-        canonical = soup.find('link', attrs={'rel': 'canonical'})
-        canonical_url = canonical.get('href', '') if canonical else ""
+    async def check_async(self, url, session, limiter=None):
+        return await self.cache.get_or_compute_async(url, lambda: self._fetch_async(url, session, limiter))
 
-        noindex = soup.find('meta', attrs={'name': 'robots', 'content': re.compile('noindex', re.I)})
-        has_noindex = bool(noindex)
 
-        og_tags = soup.find_all('meta', attrs={'property': re.compile('^og:')})
-        has_og_tags = len(og_tags) > 0
+stylesheet_analyzer = StylesheetAnalyzer()
 
-        schema_script = soup.find('script', attrs={'type': 'application/ld+json'})
-        has_schema = bool(schema_script)
 
-        robots_txt_url = urljoin(url, '/robots.txt')
+def check_last_modified(headers, now=None):
+    last_mod = headers.get('Last-Modified')
+    if last_mod:
         try:
-            robots_response = requests.get(robots_txt_url, timeout=5)
-            has_robots = robots_response.status_code == 200
-            robots_content = robots_response.text if has_robots else ""
-            has_disallow = parse_robots(robots_content) if has_robots else False
+            dt = datetime.strptime(last_mod, '%a, %d %b %Y %H:%M:%S GMT')
+            days_ago = ((now or datetime.now()) - dt).days
+            return days_ago <= 30, days_ago
         except:
-            has_robots = False
-            robots_content = ""
-            has_disallow = False
+            pass
+    return False, 0
 
-        has_sitemap, sitemap_count = check_sitemap(url)
 
-        parsed_url = urlparse(url)
-        www_canonical = fetch_with_redirect_check(url, 'www')
-        non_www_canonical = fetch_with_redirect_check(url.replace('www.', ''), None)
-        proper_canonicalization = www_canonical and non_www_canonical
+def robots_sitemaps(robots_content):
+    return [location.strip() for location in re.findall(r'^\s*Sitemap:\s*(\S+)', robots_content, re.I | re.M)]
 
-        is_fresh, days_ago = check_last_modified(response)
 
-        broken_count, checked_count = check_broken_links(soup, url)
-        has_broken = broken_count > 0
+def site_sitemaps(url, session=None, http_cache=None, cache=None):
+    has_robots, robots_content, _ = site_fact(cache or site_cache, url, 'robots', check_robots, session, http_cache)
+    locations = robots_sitemaps(robots_content) if has_robots else []
+    return locations or [urljoin(site_root(url), '/sitemap.xml')]
 
-        css_links = [urljoin(url, link['href']) for link in soup.find_all('link', rel='stylesheet') if link.get('href')]
-        has_media_queries = False
-        for css_url in css_links[:2]:
-            if check_css_media_queries(css_url):
-                has_media_queries = True
-                break
 
-        html_size = len(response.content) / 1024
+class _CappedReader:
+    def __init__(self, fileobj, max_bytes):
+        self._file = fileobj
+        self._remaining = max_bytes
 
-        scripts = soup.find_all('script', src=True)
-        styles = soup.find_all('link', rel='stylesheet')
-        total_requests = len(images) + len(scripts) + len(styles)
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.read(size) if size else b''
+        self._remaining -= len(data)
+        return data
 
-        has_image_expires = False
-        if images:
-            sample_img = urljoin(url, images[0].get('src', ''))
-            has_image_expires = check_image_expires(sample_img)
 
-        unminified_js = [s.get('src') for s in scripts if '.min' not in s.get('src', '')]
-        unminified_css = [s.get('href') for s in styles if '.min' not in s.get('href', '')]
-        has_minified_js = len(unminified_js) == 0
-        has_minified_css = len(unminified_css) == 0
+class _SitemapStopped(Exception):
+    pass
 
-        is_https = url.startswith('https')
 
-        wp_content = False
+def open_sitemap(location, session=None, http_cache=None, max_bytes=SITEMAP_MAX_MB * 1024 * 1024):
+    if http_cache is not None:
+        response = http_cache.get(location, session=session, timeout=5, max_bytes=max_bytes)
+        source = io.BytesIO(response.content)
+    else:
+        session = session or get_session()
+        response = session.get(location, timeout=5, allow_redirects=True, stream=True)
+        response.raw.decode_content = True
+        response.raw.auto_close = False
+        source = response.raw
+    if response.status_code != 200:
+        response.close()
+        return response, None
+    source = io.BufferedReader(source, STREAM_CHUNK_SIZE)
+    if source.peek(2)[:2] == b'\x1f\x8b':
+        source = gzip.GzipFile(fileobj=source)
+    return response, _CappedReader(source, max_bytes)
+
+
+def read_sitemap(location, on_url=None, session=None, http_cache=None, max_children=SITEMAP_MAX_FILES):
+    count = 0
+    children = []
+    response = None
+    try:
+        response, source = open_sitemap(location, session, http_cache)
+        if source is None:
+            return False, 0, children, response.status_code >= 500
+        root = None
+        for event, element in ElementTree.iterparse(source, events=('start', 'end')):
+            if root is None:
+                root = element
+                continue
+            tag = element.tag.rsplit('}', 1)[-1]
+            if event != 'end':
+                continue
+            if tag == 'loc' and element.text:
+                loc = element.text.strip()
+                if root.tag.endswith('sitemapindex'):
+                    if len(children) < max_children:
+                        children.append(urljoin(location, loc))
+                else:
+                    count += 1
+                    if on_url is not None:
+                        on_url(loc)
+            elif tag in ('url', 'sitemap'):
+                root.clear()
+        return root is not None, count, children, False
+    except requests.RequestException:
+        return count > 0, count, children, True
+    except (ElementTree.ParseError, OSError, EOFError):
+        return count > 0, count, children, False
+    finally:
+        if response is not None:
+            response.close()
+
+
+def walk_sitemaps(locations, on_url=None, session=None, http_cache=None, max_sitemaps=SITEMAP_MAX_FILES,
+                  workers=SITEMAP_WORKERS, stop=None):
+    seen = set()
+    found = False
+    failed = False
+    total = 0
+    pending = set()
+    stage = getattr(_stage_local, 'call', None)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        def submit(location):
+            if location not in seen and len(seen) < max_sitemaps:
+                seen.add(location)
+                pending.add(pool.submit(run_in_stage, stage, read_sitemap, location, on_url, session, http_cache,
+                                        max_sitemaps))
+
+        for location in locations:
+            submit(location)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.discard(future)
+                try:
+                    ok, count, children, unavailable = future.result()
+                except _SitemapStopped:
+                    continue
+                found = found or ok
+                failed = failed or unavailable
+                total += count
+                if stop is None or not stop.is_set():
+                    for child in children:
+                        submit(child)
+    return found, total, len(seen), failed
+
+
+def check_sitemap(url, session=None, http_cache=None, cache=None):
+    try:
+        found, count, _, failed = walk_sitemaps(site_sitemaps(url, session, http_cache, cache), session=session,
+                                                http_cache=http_cache)
+        return Transient((found, count)) if failed else (found, count)
+    except Exception:
+        return Transient((False, 0))
+
+
+def iter_sitemap_urls(url, session=None, http_cache=None, cache=None, locations=None, buffer_size=1000):
+    if locations is None:
+        locations = site_sitemaps(url, session, http_cache, cache)
+    urls = queue.Queue(maxsize=buffer_size)
+    stop = threading.Event()
+    done = object()
+
+    def on_url(loc):
+        while True:
+            if stop.is_set():
+                raise _SitemapStopped()
+            try:
+                urls.put(loc, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def produce():
         try:
-            wp_resp = requests.head(urljoin(url, '/wp-content/'), timeout=5)
-            wp_content = wp_resp.status_code == 200
-        except:
-            pass
-        visible_plugins = wp_content
-
-        issues = 0
-        recommendations = 0
-        good_results = 0
-        total_items = 0
+            walk_sitemaps(locations, on_url, session, http_cache, stop=stop)
+        finally:
+            while not stop.is_set():
+                try:
+                    urls.put(done, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            loc = urls.get()
+            if loc is done:
+                return
+            yield loc
+    finally:
+        stop.set()
 
-        if 50 <= title_length <= 70:
-            good_results += 1
-        else:
-            issues += 1
-        total_items += 1
 
-        if 150 <= meta_desc_length <= 160:
-            good_results += 1
-        else:
-            if meta_desc_length == 0:
-                issues += 1
-            else:
-                recommendations += 1
-        total_items += 1
+def parse_robots(robots_content):
+    disallows = re.findall(r'Disallow:\s*(.+)', robots_content, re.I)
+    return len(disallows) > 0
 
-        if len(common_keywords_title_desc) > 0:
-            good_results += 1
-        else:
-            recommendations += 1
-        total_items += 1
 
-        if len(h1_tags) == 1:
-            good_results += 1
-        elif len(h1_tags) == 0:
-            issues += 1
-        else:
-            recommendations += 1
-        total_items += 1
+def check_robots(url, session=None, http_cache=None):
+    robots_txt_url = urljoin(url, '/robots.txt')
+    try:
+        robots_response = http_get(robots_txt_url, session=session, timeout=5, http_cache=http_cache)
+        if robots_response.status_code >= 500:
+            return Transient((False, "", False))
+        has_robots = robots_response.status_code == 200
+        robots_content = robots_response.text if has_robots else ""
+        has_disallow = parse_robots(robots_content) if has_robots else False
+        return has_robots, robots_content, has_disallow
+    except:
+        return Transient((False, "", False))
 
-        if len(h2_tags) > 0:
-            good_results += 1
-        else:
-            recommendations += 1
-        total_items += 1
 
-        if len(images_without_alt) == 0:
-            good_results += 1
-        else:
-            issues += 1
-        total_items += 1
+def check_wp_content(url, session=None):
+    session = session or get_session()
+    try:
+        wp_resp = session.head(urljoin(url, '/wp-content/'), timeout=5)
+        return wp_resp.status_code == 200
+    except:
+        return False
 
-        total_links = len(internal_links) + len(external_links)
-        if 10 <= total_links <= 100:
-            good_results += 1
-        else:
-            recommendations += 1
-        total_items += 1
 
-        if canonical_url:
-            good_results += 1
+def check_www_redirect(url, session=None):
+    return fetch_with_redirect_check(url, 'www', session)
+
+
+def check_non_www_redirect(url, session=None):
+    return fetch_with_redirect_check(url.replace('www.', ''), None, session)
+
+
+PROFILES = {
+    'offline': frozenset(['page']),
+    'fast': frozenset(['page', 'timing']),
+    'full': frozenset(['page', 'timing', 'robots', 'sitemap', 'redirects', 'wp_content', 'links', 'css', 'assets']),
+}
+OFFLINE_INPUTS = frozenset(['page', 'timing'])
+DEFAULT_PROFILE = 'full'
+
+
+@dataclass(slots=True)
+class AnalysisResult:
+    url: str
+    title: str
+    title_length: int
+    meta_description: str
+    meta_desc_length: int
+    common_keywords: str
+    keywords_title_desc: list
+    top_keywords: list
+    keyword_usage: dict
+    h1_count: int
+    h1_tags: list
+    h2_count: int
+    h2_tags: list
+    image_count: int
+    images_without_alt_count: int
+    images_without_alt: list
+    internal_links: int
+    external_links: int
+    canonical: str
+    has_noindex: bool
+    has_og_tags: bool
+    has_schema: bool
+    is_fresh: bool
+    days_ago: int
+    html_size: float
+    html_truncated: bool
+    response_time: float
+    total_requests: int
+    script_count: int
+    stylesheet_count: int
+    unminified_js: list
+    is_https: bool
+    has_robots: bool = None
+    robots_content: str = None
+    has_disallow: bool = None
+    has_sitemap: bool = None
+    sitemap_count: int = None
+    proper_canonicalization: bool = None
+    visible_plugins: bool = None
+    has_broken_links: bool = None
+    broken_count: int = None
+    checked_links: int = None
+    broken_links: list = None
+    link_statuses: dict = None
+    has_media_queries: bool = None
+    css_bytes: int = None
+    css_files: int = None
+    inline_styles: int = None
+    unminified_css: list = None
+    has_image_expires: bool = None
+    page_weight: int = None
+    unknown_size_assets: int = None
+    heaviest_assets: list = None
+    uncached_assets: list = None
+    uncached_count: int = None
+    profile: str = DEFAULT_PROFILE
+    skipped_checks: list = field(default_factory=list)
+    check_results: dict = field(default_factory=dict)
+    score: int = 0
+    total_items: int = 0
+    issues: int = 0
+    recommendations: int = 0
+    good_results: int = 0
+    # Peak RSS of the whole process so far, not of this analysis alone.
+    process_peak_rss_mb: float = None
+    stages: dict = field(default_factory=dict)
+    content_hash: str = None
+    reused: bool = False
+    previous_audit: str = None
+    diff: dict = None
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{item.name: data[item.name] for item in fields(cls) if item.name in data})
+
+
+GOOD = 'good'
+RECOMMENDATION = 'recommendation'
+ISSUE = 'issue'
+
+class Check:
+    __slots__ = ('name', 'inputs', 'evaluate')
+
+    def __init__(self, name, inputs, evaluate):
+        self.name = name
+        self.inputs = frozenset(inputs)
+        self.evaluate = evaluate
+
+
+CHECKS = [
+    Check('title', ['page'], lambda d: GOOD if 50 <= d.title_length <= 70 else ISSUE),
+    Check('meta_description', ['page'],
+          lambda d: GOOD if 150 <= d.meta_desc_length <= 160 else ISSUE if d.meta_desc_length == 0
+          else RECOMMENDATION),
+    Check('keywords_title_description', ['page'], lambda d: GOOD if d.keywords_title_desc else RECOMMENDATION),
+    Check('h1', ['page'], lambda d: GOOD if d.h1_count == 1 else ISSUE if d.h1_count == 0 else RECOMMENDATION),
+    Check('h2', ['page'], lambda d: GOOD if d.h2_count else RECOMMENDATION),
+    Check('image_alt', ['page'], lambda d: GOOD if d.images_without_alt_count == 0 else ISSUE),
+    Check('links_ratio', ['page'],
+          lambda d: GOOD if 10 <= d.internal_links + d.external_links <= 100 else RECOMMENDATION),
+    Check('canonical', ['page'], lambda d: GOOD if d.canonical else RECOMMENDATION),
+    Check('noindex', ['page'], lambda d: GOOD if not d.has_noindex else RECOMMENDATION),
+    Check('robots', ['robots'], lambda d: GOOD if d.has_robots else ISSUE),
+    Check('sitemap', ['sitemap'], lambda d: GOOD if d.has_sitemap else RECOMMENDATION),
+    Check('opengraph', ['page'], lambda d: GOOD if d.has_og_tags else RECOMMENDATION),
+    Check('schema', ['page'], lambda d: GOOD if d.has_schema else RECOMMENDATION),
+    Check('www_canonicalization', ['redirects'], lambda d: GOOD if d.proper_canonicalization else RECOMMENDATION),
+    Check('freshness', ['page'], lambda d: GOOD if d.is_fresh else RECOMMENDATION),
+    Check('broken_links', ['links'], lambda d: GOOD if not d.has_broken_links else ISSUE),
+    Check('media_queries', ['css'], lambda d: GOOD if d.has_media_queries else RECOMMENDATION),
+    Check('page_objects', ['page'], lambda d: GOOD if d.total_requests <= 20 else ISSUE),
+    Check('page_size', ['page'], lambda d: GOOD if d.html_size <= 50 else ISSUE),
+    Check('response_time', ['page', 'timing'], lambda d: GOOD if d.response_time < 0.8 else RECOMMENDATION),
+    Check('image_expires', ['assets'], lambda d: GOOD if d.has_image_expires else RECOMMENDATION),
+    Check('minify_css', ['css'], lambda d: GOOD if not d.unminified_css else RECOMMENDATION),
+    Check('minify_js', ['page'], lambda d: GOOD if not d.unminified_js else RECOMMENDATION),
+    Check('https', ['page'], lambda d: GOOD if d.is_https else ISSUE),
+    Check('visible_plugins', ['wp_content'], lambda d: GOOD if not d.visible_plugins else RECOMMENDATION),
+]
+
+
+def select_checks(profile=DEFAULT_PROFILE, checks=None, available=None):
+    available = PROFILES[profile] if available is None else PROFILES[profile] & available
+    selected = []
+    skipped = []
+    for check in checks if checks is not None else CHECKS:
+        if check.inputs <= available:
+            selected.append(check)
         else:
-            recommendations += 1
-        total_items += 1
-
-        if not has_noindex:
-            good_results += 1
+            skipped.append(check.name)
+    inputs = frozenset().union(*(check.inputs for check in selected))
+    return selected, skipped, inputs
+
+
+def score_checks(checks, result):
+    result.check_results = {check.name: check.evaluate(result) for check in checks}
+    counts = Counter(result.check_results.values())
+    result.score = int(counts[GOOD] / len(checks) * 100) if checks else 0
+    result.total_items = len(checks)
+    result.issues = counts[ISSUE]
+    result.recommendations = counts[RECOMMENDATION]
+    result.good_results = counts[GOOD]
+    return result
+
+
+# Bump when a check or the analysis changes, so stored results of unchanged pages are audited again.
+CHECKS_VERSION = 2
+
+
+def check_set_version(checks):
+    names = ','.join(check.name for check in checks)
+    return f"{CHECKS_VERSION}-{hashlib.sha1(names.encode('ascii')).hexdigest()[:12]}"
+
+
+def diff_results(previous, current):
+    checks = {}
+    for name in dict.fromkeys(list(previous.check_results) + list(current.check_results)):
+        before, after = previous.check_results.get(name), current.check_results.get(name)
+        if before != after:
+            checks[name] = [before, after]
+    return {'score': [previous.score, current.score], 'checks': checks}
+
+
+def describe_diff(diff):
+    before, after = diff['score']
+    changes = [f"score {before} -> {after}" if before != after else f"score {after} unchanged"]
+    changes += [f"{name}: {before or 'not checked'} -> {after or 'not checked'}"
+                for name, (before, after) in diff['checks'].items()]
+    return '; '.join(changes)
+
+
+def analyze_seo(url, executor=None, max_workers=PROBE_WORKERS, session=None, cache=None, http_cache=None,
+                exact_timing=False, max_page_bytes=MAX_PAGE_MB * 1024 * 1024, keyword_corpus=None, link_sink=None,
+                checker=None, max_links=None, css_analyzer=None, auditor=None, profile=DEFAULT_PROFILE,
+                metrics_hook=None, store=None):
+    session = session or get_session()
+    cache = cache if cache is not None else site_cache
+    checker = checker or link_checker
+    css_analyzer = css_analyzer or stylesheet_analyzer
+    auditor = auditor or asset_auditor
+    metrics = StageMetrics()
+    options = (session, cache, http_cache, exact_timing, max_page_bytes, keyword_corpus, link_sink, checker,
+               max_links, css_analyzer, auditor, profile, store)
+    try:
+        if executor is not None:
+            result = _analyze_seo(url, executor, metrics, *options)
         else:
-            recommendations += 1
-        total_items += 1
-
-        if has_robots:
-            good_results += 1
+            executor = ThreadPoolExecutor(max_workers=max_workers)
+            try:
+                result = _analyze_seo(url, executor, metrics, *options)
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
+    except Exception:
+        notify_metrics(metrics_hook, url, metrics.snapshot())
+        raise
+    notify_metrics(metrics_hook, url, result.stages)
+    return result
+
+
+def page_result(url, page, headers, html_bytes, html_truncated=False, response_time=None, keyword_corpus=None,
+                link_sink=None, now=None):
+    title_text = page.title or ""
+    meta_desc_text = page.meta_description or ""
+    h1_texts = page.h1
+    h2_texts = page.h2
+
+    images = [src for src, _ in page.images]
+    images_without_alt = [src for src, alt in page.images if not alt]
+
+    internal_links = set()
+    external_links = set()
+    netloc = urlparse(url).netloc
+    for href in page.links:
+        absolute_url = urljoin(url, href)
+        parsed = urlparse(absolute_url)
+        if parsed.netloc == netloc:
+            internal_links.add(absolute_url)
         else:
-            issues += 1
-        total_items += 1
+            external_links.add(absolute_url)
+    if link_sink is not None:
+        link_sink(internal_links)
+
+    term_counts = count_terms(tokenize(page.content_text))
+    page.text = []
+    if keyword_corpus is not None:
+        keyword_corpus.add(url, term_counts)
+    common_keywords = term_counts.most_common(10)
+    common_keywords_str = ', '.join([kw[0] for kw in common_keywords[:10]])
+
+    title_tokens = tokenize(title_text)
+    title_keywords = set(title_tokens)
+    desc_keywords = set(tokenize(meta_desc_text))
+    headings_keywords = set(tokenize(' '.join(h1_texts + h2_texts)))
+    common_keywords_title_desc = [kw for kw in dict.fromkeys(title_tokens)
+                                  if kw in desc_keywords and is_keyword(kw)][:5]
+
+    top_keywords = [kw[0] for kw in common_keywords[:5]]
+    keyword_usage = {}
+    for kw in top_keywords:
+        in_title = kw in title_keywords
+        in_desc = kw in desc_keywords
+        in_headings = kw in headings_keywords
+        keyword_usage[kw] = {'title': in_title, 'description': in_desc, 'headings': in_headings}
+
+    is_fresh, days_ago = check_last_modified(headers, now)
+    assets = asset_targets(url, images, page.scripts, page.stylesheets)
+    unminified_js = [src for src in page.scripts if '.min' not in src]
+
+    result = AnalysisResult(
+        url=url,
+        title=title_text,
+        title_length=len(title_text),
+        meta_description=meta_desc_text,
+        meta_desc_length=len(meta_desc_text),
+        common_keywords=common_keywords_str,
+        keywords_title_desc=common_keywords_title_desc,
+        top_keywords=top_keywords,
+        keyword_usage=keyword_usage,
+        h1_count=len(h1_texts),
+        h1_tags=h1_texts[:5],
+        h2_count=len(h2_texts),
+        h2_tags=h2_texts[:7],
+        image_count=len(images),
+        images_without_alt_count=len(images_without_alt),
+        images_without_alt=images_without_alt[:3],
+        internal_links=len(internal_links),
+        external_links=len(external_links),
+        canonical=page.canonical or "",
+        has_noindex=page.has_noindex,
+        has_og_tags=page.og_tags > 0,
+        has_schema=page.has_schema,
+        is_fresh=is_fresh,
+        days_ago=days_ago,
+        html_size=round(html_bytes / 1024, 2),
+        html_truncated=html_truncated,
+        response_time=round(response_time, 3) if response_time is not None else None,
+        total_requests=len(assets),
+        script_count=len(page.scripts),
+        stylesheet_count=len(page.stylesheets),
+        unminified_js=unminified_js[:2],
+        is_https=url.startswith('https'),
+    )
+    return result, internal_links, external_links, assets
+
+
+def apply_probes(result, html_bytes, robots=None, sitemap=None, redirects=None, visible_plugins=None,
+                 link_results=None, css_results=None, inline_css=(), asset_results=None):
+    if robots is not None:
+        result.has_robots, robots_content, result.has_disallow = robots
+        result.robots_content = robots_content[:ROBOTS_EXCERPT_CHARS] if robots_content is not None else None
+
+    if sitemap is not None:
+        result.has_sitemap, result.sitemap_count = sitemap
+
+    if redirects is not None:
+        www_canonical, non_www_canonical = redirects
+        result.proper_canonicalization = www_canonical and non_www_canonical
+
+    if link_results is not None:
+        result.broken_count = sum(1 for link in link_results if not link['ok'])
+        result.checked_links = len(link_results)
+        result.has_broken_links = result.broken_count > 0
+        result.broken_links = [(link['url'], link['status']) for link in link_results if not link['ok']]
+        statuses = Counter(str(link['status']) if link['status'] is not None else 'error' for link in link_results)
+        result.link_statuses = dict(sorted(statuses.items()))
+
+    if css_results is not None:
+        result.has_media_queries = any(css['has_media_queries'] for css in css_results) or \
+            any(has_media for _, has_media, _ in inline_css)
+        result.css_bytes = sum(css['bytes'] for css in css_results) + sum(size for size, _, _ in inline_css)
+        result.css_files = len(css_results)
+        unminified_css = [css['url'] for css in css_results
+                          if css['minified'] is False or (css['minified'] is None and '.min' not in css['url'])]
+        result.unminified_css = unminified_css[:2]
+    result.inline_styles = len(inline_css)
+
+    if asset_results is not None:
+        asset_summary = summarize_assets(asset_results, html_bytes)
+        image_results = [asset for asset in asset_results
+                         if asset['type'] == 'image' and asset['status'] == 200]
+        result.has_image_expires = bool(image_results) and all(asset['cached'] for asset in image_results)
+        result.page_weight = asset_summary['page_weight']
+        result.unknown_size_assets = asset_summary['unknown_size']
+        result.heaviest_assets = asset_summary['heaviest']
+        result.uncached_assets = asset_summary['uncached'][:10]
+        result.uncached_count = len(asset_summary['uncached'])
+
+    if visible_plugins is not None:
+        result.visible_plugins = visible_plugins
+    return result
+
+
+def _analyze_seo(url, executor, metrics, session, cache, http_cache, exact_timing, max_page_bytes, keyword_corpus,
+                 link_sink, checker, max_links, css_analyzer, auditor, profile, store):
+    try:
+        checks, skipped_checks, inputs = select_checks(profile)
+        digest = hashlib.sha256() if store is not None else None
+
+        def site_probe(name, probe, *args):
+            return executor.submit(metrics.timed, name, site_fact, cache, url, name, probe, *args)
+
+        def site_probes():
+            probes = {}
+            if 'robots' in inputs:
+                probes['robots'] = site_probe('robots', check_robots, session, http_cache)
+            if 'sitemap' in inputs:
+                probes['sitemap'] = site_probe('sitemap', check_sitemap, session, http_cache, cache)
+            if 'redirects' in inputs:
+                probes['www'] = site_probe('www', check_www_redirect, session)
+                probes['non_www'] = site_probe('non_www', check_non_www_redirect, session)
+            if 'wp_content' in inputs:
+                probes['wp_content'] = site_probe('wp_content', check_wp_content, session)
+            return probes
+
+        def probe_result(name):
+            return probes[name].result() if name in probes else None
+
+        # With a result store the page may be reused, so the site probes wait for the reuse decision.
+        probes = site_probes() if store is None else None
+        with metrics.stage('fetch') as fetch_stage:
+            response, page, html_bytes, html_truncated, response_time = fetch_page_elements(
+                url, session=session, max_bytes=max_page_bytes, http_cache=None if exact_timing else http_cache,
+                digest=digest)
+            fetch_stage.seconds = response_time
+        parse_started = time.perf_counter()
+        html_parse_time = max(parse_started - fetch_stage.started - response_time, 0.0)
+
+        result, internal_links, external_links, assets = page_result(
+            url, page, response.headers, html_bytes, html_truncated, response_time, keyword_corpus, link_sink)
+        parse_finished = time.perf_counter()
+        metrics.record('parse', fetch_stage.started, parse_finished,
+                       html_parse_time + parse_finished - parse_started)
+
+        previous = None
+        if store is not None:
+            result.content_hash = digest.hexdigest()
+            version = check_set_version(checks)
+            previous = store.get(url, profile)
+            if store.unchanged(previous, result.content_hash, version):
+                with metrics.stage('scoring'):
+                    result = store.reuse(previous, result, checks)
+                result.process_peak_rss_mb = peak_rss_mb()
+                result.stages = metrics.snapshot()
+                return result
+            probes = site_probes()
+
+        link_futures = []
+        if 'links' in inputs:
+            link_futures = [executor.submit(metrics.timed, 'links', checker.check, link, session)
+                            for link in link_targets(internal_links | external_links, max_links)]
+
+        css_futures = []
+        inline_css = []
+        if 'css' in inputs:
+            css_links = list(dict.fromkeys(urljoin(url, href) for href in page.stylesheets if href))
+            css_futures = [executor.submit(metrics.timed, 'css', css_analyzer.check, css_url, session, http_cache)
+                           for css_url in css_links]
+            inline_css = [scan_css([style.encode('utf-8')]) for style in page.inline_styles]
+        page.inline_styles = []
+
+        asset_futures = []
+        if 'assets' in inputs:
+            asset_futures = [executor.submit(metrics.timed, 'assets', auditor.check, asset_url, session)
+                             for asset_url in assets]
+
+        apply_probes(
+            result, html_bytes,
+            robots=probe_result('robots'),
+            sitemap=probe_result('sitemap'),
+            redirects=(probe_result('www'), probe_result('non_www')) if 'www' in probes else None,
+            visible_plugins=probe_result('wp_content'),
+            link_results=[future.result() for future in link_futures] if 'links' in inputs else None,
+            css_results=[future.result() for future in css_futures] if 'css' in inputs else None,
+            inline_css=inline_css,
+            asset_results=[dict(future.result(), type=kind) for future, kind in zip(asset_futures, assets.values())]
+            if 'assets' in inputs else None)
+        result.profile = profile
+        result.skipped_checks = skipped_checks
+        result.process_peak_rss_mb = peak_rss_mb()
+        with metrics.stage('scoring'):
+            score_checks(checks, result)
+        if store is not None:
+            store.put(result, version, previous)
+        result.stages = metrics.snapshot()
+        return result
+    except Exception as e:
+        raise Exception(f"Error analyzing URL: {str(e)}")
 
-        if has_sitemap:
-            good_results += 1
-        else:
-            recommendations += 1
-        total_items += 1
+def parse_page(html, url, headers, response_time=None, html_truncated=False, parser=None,
+               max_bytes=MAX_PAGE_MB * 1024 * 1024, keyword_corpus=None, now=None, styles=True):
+    page_parser = create_page_parser(parser)
+    body = memoryview(html)
+    chunks = (body[i:i + STREAM_CHUNK_SIZE] for i in range(0, len(body), STREAM_CHUNK_SIZE))
+    html_bytes, truncated, _ = _feed_page_parser(chunks, headers, page_parser, max_bytes)
+    page = page_parser.close()
+    result, internal_links, external_links, assets = page_result(
+        url, page, headers, html_bytes, html_truncated or truncated, response_time, keyword_corpus, now=now)
+    css_links = list(dict.fromkeys(urljoin(url, href) for href in page.stylesheets if href)) if styles else []
+    inline_css = [scan_css([style.encode('utf-8')]) for style in page.inline_styles] if styles else []
+    return result, internal_links, external_links, assets, css_links, inline_css
+
+
+def analyze_html(html, url, headers=None, response_time=None, profile=None, parser=None,
+                 max_bytes=MAX_PAGE_MB * 1024 * 1024, keyword_corpus=None, now=None, metrics_hook=None):
+    headers = requests.structures.CaseInsensitiveDict(headers or {})
+    profile = profile or ('fast' if response_time is not None else 'offline')
+    available = OFFLINE_INPUTS if response_time is not None else OFFLINE_INPUTS - {'timing'}
+    checks, skipped_checks, _ = select_checks(profile, available=available)
+    metrics = StageMetrics()
+    with metrics.stage('parse'):
+        result = parse_page(html, url, headers, response_time, parser=parser, max_bytes=max_bytes,
+                            keyword_corpus=keyword_corpus, now=now, styles=False)[0]
+    result.inline_styles = 0
+    result.profile = profile
+    result.skipped_checks = skipped_checks
+    result.process_peak_rss_mb = peak_rss_mb()
+    with metrics.stage('scoring'):
+        score_checks(checks, result)
+    result.stages = metrics.snapshot()
+    notify_metrics(metrics_hook, url, result.stages)
+    return result
+
+
+def _aiohttp():
+    try:
+        import aiohttp
+    except ImportError:
+        raise RuntimeError("the asyncio API needs aiohttp: pip install aiohttp") from None
+    return aiohttp
 
-        if has_og_tags:
-            good_results += 1
-        else:
-            recommendations += 1
-        total_items += 1
 
-        if has_schema:
-            good_results += 1
-        else:
-            recommendations += 1
-        total_items += 1
+_default_renderer = None
+_default_renderer_lock = threading.Lock()
 
-        if proper_canonicalization:
-            good_results += 1
-        else:
-            recommendations += 1
-        total_items += 1
 
-        if is_fresh:
-            good_results += 1
-        else:
-            recommendations += 1
-        total_items += 1
+def get_report_renderer():
+    global _default_renderer
+    with _default_renderer_lock:
+        if _default_renderer is None:
+            from pdf_report import ReportRenderer
 
-        if not has_broken:
-            good_results += 1
-        else:
-            issues += 1
-        total_items += 1
+            _default_renderer = ReportRenderer()
+        return _default_renderer
 
-        if has_media_queries:
-            good_results += 1
-        else:
-            recommendations += 1
-        total_items += 1
 
-        if total_requests <= 20:
-            good_results += 1
-        else:
-            issues += 1
-        total_items += 1
+def generate_pdf(data, output_file, renderer=None):
+    return (renderer or get_report_renderer()).render(data, output_file)
 
-        if html_size <= 50:
-            good_results += 1
-        else:
-            issues += 1
-        total_items += 1
 
-        if response_time < 0.8:
-            good_results += 1
-        else:
-            recommendations += 1
-        total_items += 1
+def normalize_input_url(url):
+    url = url.strip()
+    if not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+    return url
+
+
+def report_filename(url, output_dir='.', extension='pdf'):
+    parsed = urlparse(url)
+    domain = re.sub(r'[^A-Za-z0-9-]', '', parsed.netloc.replace('www.', ''))
+    slug = re.sub(r'[^A-Za-z0-9]+', '-', f"{parsed.path} {parsed.query}").strip('-')[:80]
+    name = f"foxseo-{domain}-{slug}.{extension}" if slug else f"foxseo-{domain}.{extension}"
+    return os.path.join(output_dir, name)
+
+
+class ReportWriter:
+    def write(self, result):
+        raise NotImplementedError
+
+    def drain(self):
+        pass
+
+    def stats(self):
+        return None
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class PdfReportWriter(ReportWriter):
+    def __init__(self, output_dir='.', metrics_hook=None, store=None):
+        self.output_dir = output_dir
+        self.metrics_hook = metrics_hook
+        self.store = store
+        os.makedirs(output_dir, exist_ok=True)
+
+    def write(self, result):
+        output_file = report_filename(result.url, self.output_dir)
+        if self.store is not None and self.store.reuse_report(result, output_file):
+            return output_file
+        result.stages['render'] = stage_record(generate_pdf(result, output_file))
+        notify_metrics(self.metrics_hook, result.url, {'render': result.stages['render']})
+        if self.store is not None:
+            self.store.set_report(result.url, result.profile, output_file)
+        return output_file
+
+
+class PipelinedPdfReportWriter(PdfReportWriter):
+    def __init__(self, output_dir='.', processes=None, queue_size=RENDER_QUEUE_SIZE, metrics_hook=None,
+                 store=None):
+        super().__init__(output_dir, metrics_hook, store)
+        self.processes = processes or os.cpu_count() or 1
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._slots = threading.BoundedSemaphore(self.processes * 2)
+        self._pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.processes,
+                                                            mp_context=multiprocessing.get_context('spawn'))
+        self._futures = set()
+        self._lock = threading.Lock()
+        self._started = time.time()
+        self.rendered = 0
+        self.render_time = 0.0
+        self.max_queue_depth = 0
+        self.failures = []
+        self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self._dispatcher.start()
+
+    def write(self, result):
+        output_file = report_filename(result.url, self.output_dir)
+        if self.store is not None and self.store.reuse_report(result, output_file):
+            return output_file
+        self._queue.put((result, output_file))
+        with self._lock:
+            self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return output_file
+
+    def _dispatch(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            self._slots.acquire()
+            result, output_file = item
+            future = self._pool.submit(generate_pdf, result, output_file)
+            with self._lock:
+                self._futures.add(future)
+            future.add_done_callback(lambda future, result=result, output_file=output_file:
+                                     self._rendered(future, result, output_file))
+            self._queue.task_done()
+
+    def _rendered(self, future, result, output_file):
+        url = result.url
+        try:
+            elapsed = future.result()
+            with self._lock:
+                self.rendered += 1
+                self.render_time += elapsed
+            notify_metrics(self.metrics_hook, url, {'render': stage_record(elapsed)})
+            if self.store is not None:
+                self.store.set_report(url, result.profile, output_file)
+        except Exception as e:
+            with self._lock:
+                self.failures.append((url, str(e)))
+            print(f"[render failed] {url}: {str(e)}")
+        finally:
+            with self._lock:
+                self._futures.discard(future)
+            self._slots.release()
+
+    def drain(self):
+        self._queue.join()
+        with self._lock:
+            futures = list(self._futures)
+        wait(futures)
+
+    def stats(self):
+        elapsed = time.time() - self._started
+        with self._lock:
+            return {
+                'processes': self.processes,
+                'rendered': self.rendered,
+                'failed': len(self.failures),
+                'failures': list(self.failures),
+                'queue_depth': self._queue.qsize(),
+                'max_queue_depth': self.max_queue_depth,
+                'in_flight': len(self._futures),
+                'render_seconds': round(self.render_time, 2),
+                'utilization': round(self.render_time / (elapsed * self.processes), 3) if elapsed > 0 else 0.0,
+            }
+
+    def close(self):
+        if self._dispatcher.is_alive():
+            self._queue.put(None)
+            self._dispatcher.join()
+        self._pool.shutdown(wait=True)
+
+
+class StreamReportWriter(ReportWriter):
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._stream = open(path, 'w', encoding='utf-8', newline='')
+        self._lock = threading.Lock()
+        self._count = 0
+
+    def _write(self, result):
+        raise NotImplementedError
+
+    def _finish(self):
+        pass
+
+    def write(self, result):
+        with self._lock:
+            self._write(result)
+            self._count += 1
+            self._stream.flush()
+        return self.path
+
+    def close(self):
+        with self._lock:
+            if not self._stream.closed:
+                self._finish()
+                self._stream.close()
+
+
+class NdjsonReportWriter(StreamReportWriter):
+    def _write(self, result):
+        self._stream.write(json.dumps(result.to_dict(), ensure_ascii=False) + '\n')
+
+
+class CsvReportWriter(StreamReportWriter):
+    def __init__(self, path):
+        super().__init__(path)
+        self._writer = csv.DictWriter(self._stream, fieldnames=[f.name for f in fields(AnalysisResult)])
+        self._writer.writeheader()
+
+    def _write(self, result):
+        row = result.to_dict()
+        for name, value in row.items():
+            if isinstance(value, (list, dict)):
+                row[name] = json.dumps(value, ensure_ascii=False)
+        self._writer.writerow(row)
+
+
+class JsonReportWriter(StreamReportWriter):
+    def __init__(self, path, array=True):
+        super().__init__(path)
+        self.array = array
+
+    def _write(self, result):
+        if self.array:
+            self._stream.write(',\n' if self._count else '[\n')
+        elif self._count:
+            raise ValueError("a JSON report without array holds a single result")
+        self._stream.write(json.dumps(result.to_dict(), ensure_ascii=False, indent=2))
+
+    def _finish(self):
+        if self.array:
+            self._stream.write('\n]\n' if self._count else '[]\n')
+        elif self._count:
+            self._stream.write('\n')
+
+
+REPORT_FORMATS = ('pdf', 'json', 'ndjson', 'csv')
+
+
+def create_report_writer(report_format='pdf', output=None, output_dir='.', array=True, render_processes=0,
+                         metrics_hook=None, store=None):
+    if report_format == 'pdf':
+        if render_processes:
+            return PipelinedPdfReportWriter(output_dir, processes=render_processes, metrics_hook=metrics_hook,
+                                            store=store)
+        return PdfReportWriter(output_dir, metrics_hook=metrics_hook, store=store)
+    if report_format == 'json':
+        return JsonReportWriter(output, array=array)
+    if report_format == 'ndjson':
+        return NdjsonReportWriter(output)
+    if report_format == 'csv':
+        return CsvReportWriter(output)
+    raise ValueError(f"unknown report format: {report_format}")
+
+
+def read_urls(source):
+    stream = sys.stdin if source == '-' else open(source, encoding='utf-8')
+    try:
+        for line in stream:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield normalize_input_url(line)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def process_url(url, writer, **options):
+    data = analyze_seo(url, **options)
+    return data.score, writer.write(data)
+
+
+def run_batch(urls, workers=BATCH_WORKERS, per_host=PER_HOST_LIMIT, output_dir='.', session=None, tfidf=False,
+              writer=None, **options):
+    session = session or get_session()
+    if tfidf:
+        options['keyword_corpus'] = KeywordCorpus()
+    workers = max(1, workers)
+    per_host = max(1, per_host)
+    writer = writer or PdfReportWriter(output_dir)
+    urls = iter(urls)
+    max_deferred = workers * 64
+    pending = {}
+    active = {}
+    deferred = {}
+    deferred_count = 0
+    exhausted = False
+    succeeded = 0
+    failures = []
+    started = time.time()
+
+    probe_executor = ThreadPoolExecutor(max_workers=workers * PROBE_WORKERS)
+    pool = ThreadPoolExecutor(max_workers=workers)
+
+    def submit(url, host):
+        active[host] = active.get(host, 0) + 1
+        pending[pool.submit(process_url, url, writer, executor=probe_executor, session=session, **options)] = (url, host)
 
-        if has_image_expires:
-            good_results += 1
-        else:
-            recommendations += 1
-        total_items += 1
+    try:
+        while True:
+            while len(pending) < workers and deferred_count < max_deferred and not exhausted:
+                url = next(urls, None)
+                if url is None:
+                    exhausted = True
+                    break
+                host = urlparse(url).netloc.lower()
+                if active.get(host, 0) < per_host:
+                    submit(url, host)
+                else:
+                    deferred.setdefault(host, deque()).append(url)
+                    deferred_count += 1
+
+            if not pending:
+                break
 
-        if has_minified_css:
-            good_results += 1
-        else:
-            recommendations += 1
-        total_items += 1
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                url, host = pending.pop(future)
+                active[host] -= 1
+                try:
+                    score, output_file = future.result()
+                    succeeded += 1
+                    print(f"[ok] {url} -> {score}/100 ({output_file})")
+                except Exception as e:
+                    failures.append((url, str(e)))
+                    print(f"[failed] {url}: {str(e)}")
+
+                waiting = deferred.get(host)
+                if waiting:
+                    submit(waiting.popleft(), host)
+                    deferred_count -= 1
+                    if not waiting:
+                        del deferred[host]
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        probe_executor.shutdown(wait=False, cancel_futures=True)
+        writer.drain()
+
+    summary = run_summary(started, succeeded, failures, session, options, writer)
+    print_batch_summary(summary)
+    return summary
+
+
+def run_summary(started, succeeded, failures, session, options, writer=None):
+    elapsed = time.time() - started
+    total = succeeded + len(failures)
+    summary = {
+        'total': total,
+        'succeeded': succeeded,
+        'failed': len(failures),
+        'failures': failures,
+        'elapsed': round(elapsed, 2),
+        'pages_per_minute': round(total / elapsed * 60, 1) if elapsed > 0 else 0.0,
+        'http': session_stats(session) if session is not None else None,
+        'site_cache': (options.get('cache') or site_cache).stats(),
+        'link_cache': (options.get('checker') or link_checker).cache.stats(),
+        'css_cache': (options.get('css_analyzer') or stylesheet_analyzer).cache.stats(),
+        'asset_cache': (options.get('auditor') or asset_auditor).cache.stats(),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    if options.get('http_cache') is not None:
+        summary['http_cache'] = options['http_cache'].stats()
+    if options.get('keyword_corpus') is not None:
+        summary['tfidf'] = options['keyword_corpus'].scores(top_k=TFIDF_TOP_K)
+    render = writer.stats() if writer is not None else None
+    if render is not None:
+        summary['render'] = render
+    if isinstance(options.get('metrics_hook'), MetricsLog):
+        summary['stages'] = options['metrics_hook'].stats()
+    if options.get('store') is not None:
+        summary['store'] = options['store'].stats()
+    return summary
+
+
+def normalize_url(url):
+    parsed = urlparse(url)
+    scheme = parsed.scheme.lower()
+    netloc = parsed.netloc.lower()
+    if (scheme, netloc.rpartition(':')[2]) in (('http', '80'), ('https', '443')):
+        netloc = netloc.rpartition(':')[0]
+    return urlunparse((scheme, netloc, parsed.path or '/', parsed.params, parsed.query, ''))
+
+
+def url_fingerprint(url):
+    return int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def is_crawlable(url):
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https'):
+        return False
+    return os.path.splitext(parsed.path)[1].lower() not in NON_HTML_EXTENSIONS
+
+
+def _crawl_page(url, writer, options):
+    links = []
+    score, output_file = process_url(url, writer, link_sink=links.extend, **options)
+    return score, output_file, links
+
+
+def crawl_site(start_url, max_pages=CRAWL_MAX_PAGES, max_depth=CRAWL_MAX_DEPTH, workers=BATCH_WORKERS,
+               output_dir='.', session=None, use_sitemap=True, respect_robots=True, max_frontier=CRAWL_MAX_FRONTIER,
+               tfidf=False, writer=None, **options):
+    session = session or get_session()
+    if tfidf:
+        options['keyword_corpus'] = KeywordCorpus()
+    workers = max(1, workers)
+    writer = writer or PdfReportWriter(output_dir)
+    start_url = normalize_url(start_url)
+    host = urlparse(start_url).netloc
+    http_cache = options.get('http_cache')
+
+    robots = None
+    if respect_robots:
+        has_robots, robots_content, _ = site_fact(options.get('cache') or site_cache, start_url, 'robots',
+                                                  check_robots, session, http_cache)
+        if has_robots:
+            from urllib.robotparser import RobotFileParser
+
+            robots = RobotFileParser()
+            robots.parse(robots_content.splitlines())
+    user_agent = session.headers.get('User-Agent', '*')
+
+    seen = set()
+    frontier = deque()
+    counters = {'blocked': 0, 'dropped': 0}
+
+    def enqueue(url, depth):
+        url = normalize_url(url)
+        if urlparse(url).netloc != host or not is_crawlable(url):
+            return
+        fingerprint = url_fingerprint(url)
+        if fingerprint in seen:
+            return
+        if robots is not None and not robots.can_fetch(user_agent, url):
+            seen.add(fingerprint)
+            counters['blocked'] += 1
+            return
+        if len(frontier) >= max_frontier:
+            counters['dropped'] += 1
+            return
+        seen.add(fingerprint)
+        frontier.append((url, depth))
+
+    enqueue(start_url, 0)
+    sitemap_stream = iter_sitemap_urls(start_url, session, http_cache, options.get('cache')) if use_sitemap else None
+    sitemap_urls = sitemap_stream
+
+    pending = {}
+    scheduled = 0
+    succeeded = 0
+    failures = []
+    started = time.time()
+    options['executor'] = ThreadPoolExecutor(max_workers=workers * PROBE_WORKERS)
+    options['session'] = session
+    pool = ThreadPoolExecutor(max_workers=workers)
 
-        if has_minified_js:
-            good_results += 1
-        else:
-            recommendations += 1
-        total_items += 1
+    try:
+        while True:
+            while len(pending) < workers and scheduled < max_pages:
+                while not frontier and sitemap_urls is not None:
+                    sitemap_url = next(sitemap_urls, None)
+                    if sitemap_url is None:
+                        sitemap_urls = None
+                    else:
+                        enqueue(sitemap_url, 0)
+                if not frontier:
+                    break
+                url, depth = frontier.popleft()
+                pending[pool.submit(_crawl_page, url, writer, options)] = (url, depth)
+                scheduled += 1
+
+            if not pending:
+                break
 
-        if is_https:
-            good_results += 1
-        else:
-            issues += 1
-        total_items += 1
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                url, depth = pending.pop(future)
+                try:
+                    score, output_file, links = future.result()
+                    succeeded += 1
+                    print(f"[ok] {url} -> {score}/100 ({output_file})")
+                except Exception as e:
+                    failures.append((url, str(e)))
+                    print(f"[failed] {url}: {str(e)}")
+                    continue
+                if depth < max_depth:
+                    for link in links:
+                        enqueue(link, depth + 1)
+    finally:
+        if sitemap_stream is not None:
+            sitemap_stream.close()
+        pool.shutdown(wait=True, cancel_futures=True)
+        options['executor'].shutdown(wait=False, cancel_futures=True)
+        writer.drain()
+
+    summary = run_summary(started, succeeded, failures, session, options, writer)
+    summary.update(counters)
+    summary['queued'] = len(frontier)
+    print_batch_summary(summary, label='Crawl')
+    print(f"Crawl: {summary['queued']} URLs left in the frontier, {summary['blocked']} blocked by robots.txt, "
+          f"{summary['dropped']} dropped because the frontier was full")
+    return summary
+
+
+def print_batch_summary(summary, label='Batch'):
+    print(f"\n{label} complete: {summary['total']} URLs in {summary['elapsed']}s "
+          f"({summary['pages_per_minute']} pages/min)")
+    print(f"Succeeded: {summary['succeeded']}, Failed: {summary['failed']}")
+    for url, error in summary['failures']:
+        print(f"  {url}: {error}")
+    if summary['http'] is not None:
+        print_http_stats(summary['http'])
+    if summary['peak_rss_mb'] is not None:
+        print(f"Peak memory of the process (RSS): {summary['peak_rss_mb']} MB")
+    print_cache_stats('Site cache', summary['site_cache'])
+    print_cache_stats('Link status cache', summary['link_cache'])
+    print_cache_stats('Stylesheet cache', summary['css_cache'])
+    print_cache_stats('Asset cache', summary['asset_cache'])
+    if 'http_cache' in summary:
+        print_cache_stats('HTTP cache', summary['http_cache'])
+    if 'render' in summary:
+        render = summary['render']
+        print(f"PDF rendering: {render['rendered']} rendered, {render['failed']} failed in {render['processes']} "
+              f"processes ({render['render_seconds']}s, {render['utilization'] * 100:.0f}% busy), "
+              f"max queue depth {render['max_queue_depth']}")
+        for url, error in render['failures']:
+            print(f"  {url}: {error}")
+    if summary.get('stages'):
+        print_stage_stats(summary['stages'])
+    if 'store' in summary:
+        print_store_stats(summary['store'])
+    if summary.get('tfidf'):
+        print("\nDistinctive keywords (TF-IDF across the batch):")
+        for url, terms in summary['tfidf'].items():
+            print(f"  {url}: {', '.join(term for term, _ in terms)}")
+
+
+def print_http_stats(stats):
+    print(f"HTTP: {stats['requests']} requests over {stats['connections']} connections "
+          f"({stats['reused']} reused, {stats['reuse_ratio'] * 100:.0f}%)")
+
+
+def print_cache_stats(label, stats):
+    print(f"{label}: {stats['hits']} hits, {stats['misses']} misses, {stats['size']} entries")
+
+
+def print_store_stats(stats):
+    print(f"Result store: {stats['reused']} unchanged pages reused, {stats['changed']} changed, "
+          f"{stats['refreshed']} unchanged but audited again, {stats['new']} new, "
+          f"{stats['reports_reused']} PDF reports reused")
+    if stats['changes']:
+        print("Changes since the last audit:")
+        for url, diff in stats['changes']:
+            print(f"  {url}: {describe_diff(diff)}")
+
+
+def print_stage_stats(stages):
+    print("Stages (time spent, requests, downloaded, errors):")
+    for name, stage in sorted(stages.items(), key=lambda item: item[1]['seconds'], reverse=True):
+        print(f"  {name:<12} {stage['seconds']:8.3f}s  {stage['requests']:6} requests  "
+              f"{stage['bytes'] / 1024:10.1f} KB  {stage['errors']:4} errors")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze on-page SEO and generate PDF reports.")
+    parser.add_argument('url', nargs='?', help="URL to analyze (prompted for when omitted)")
+    parser.add_argument('--batch', metavar='FILE',
+                        help="analyze every URL listed in FILE, one per line ('-' reads stdin)")
+    parser.add_argument('--workers', type=int, default=BATCH_WORKERS,
+                        help=f"number of pages analyzed in parallel in batch and server mode "
+                             f"(default: {BATCH_WORKERS})")
+    parser.add_argument('--per-host', type=int, default=PER_HOST_LIMIT,
+                        help=f"maximum concurrent analyses per host in batch mode (default: {PER_HOST_LIMIT})")
+    parser.add_argument('--output-dir', default='.', help="directory to write reports to (default: current directory)")
+    parser.add_argument('--format', choices=REPORT_FORMATS, default='pdf',
+                        help="report format: a PDF per URL, or the results as JSON, NDJSON or CSV written "
+                             "incrementally to a single file (default: pdf)")
+    parser.add_argument('--render-processes', type=int,
+                        help="processes rendering PDF reports in batch and crawl mode while pages are analyzed; "
+                             "0 renders in the analysis threads (default: number of CPUs, 0 on a single CPU)")
+    parser.add_argument('--output', metavar='FILE',
+                        help="file for JSON, NDJSON and CSV results (default: a file in --output-dir)")
+    parser.add_argument('--offline', metavar='PATH', action='append',
+                        help="analyze saved pages instead of fetching them: an HTML, HAR or WARC (.warc, .warc.gz) "
+                             "file or a directory of them; can be given several times")
+    parser.add_argument('--base-url', help="in offline mode, URL of the directory holding saved HTML files, used "
+                                           "to give each file its URL (default: file:// URLs)")
+    parser.add_argument('--processes', type=int,
+                        help="processes analyzing pages in offline mode (default: number of CPUs)")
+    parser.add_argument('--serve', metavar='PORT', type=int, nargs='?', const=SERVER_PORT,
+                        help=f"run an HTTP server answering /analyze?url=URL with JSON results, /report?url=URL "
+                             f"with PDF reports and /stats, keeping connections and caches warm between "
+                             f"requests (default port: {SERVER_PORT})")
+    parser.add_argument('--host', default='127.0.0.1', help="address the server listens on (default: 127.0.0.1)")
+    parser.add_argument('--result-ttl', type=int, default=RESULT_CACHE_TTL,
+                        help=f"seconds the server answers repeated requests for a URL from its last result "
+                             f"(default: {RESULT_CACHE_TTL})")
+    parser.add_argument('--crawl', action='store_true',
+                        help="crawl the site starting at URL, seeded from its sitemap and following internal links")
+    parser.add_argument('--max-pages', type=int, default=CRAWL_MAX_PAGES,
+                        help=f"maximum number of pages analyzed in crawl mode (default: {CRAWL_MAX_PAGES})")
+    parser.add_argument('--max-depth', type=int, default=CRAWL_MAX_DEPTH,
+                        help=f"maximum link depth from the seeds in crawl mode (default: {CRAWL_MAX_DEPTH})")
+    parser.add_argument('--no-sitemap', action='store_true', help="do not seed the crawl from the sitemap")
+    parser.add_argument('--ignore-robots', action='store_true', help="crawl URLs disallowed by robots.txt")
+    parser.add_argument('--tfidf', action='store_true',
+                        help="in batch mode, print the most distinctive keywords of every page scored by TF-IDF "
+                             "across all analyzed pages")
+    parser.add_argument('--profile', choices=sorted(PROFILES),
+                        help="audit profile: 'fast' runs only the checks on the page itself without extra requests, "
+                             f"'full' runs every check (default: {DEFAULT_PROFILE}; offline: 'fast' for pages with a "
+                             "recorded response time, 'offline' otherwise)")
+    parser.add_argument('--max-links', type=int,
+                        help="check at most this many unique links per page (default: all)")
+    parser.add_argument('--links-per-host', type=int, default=LINKS_PER_HOST,
+                        help=f"maximum concurrent link checks per linked host (default: {LINKS_PER_HOST})")
+    parser.add_argument('--assets-per-host', type=int, default=ASSETS_PER_HOST,
+                        help=f"maximum concurrent asset requests per asset host (default: {ASSETS_PER_HOST})")
+    parser.add_argument('--pool-size', type=int, default=POOL_SIZE,
+                        help=f"maximum kept-alive connections per host (default: {POOL_SIZE})")
+    parser.add_argument('--retries', type=int, default=HTTP_RETRIES,
+                        help=f"retries for failed connections and 502/503/504 responses (default: {HTTP_RETRIES})")
+    parser.add_argument('--site-cache-ttl', type=int, default=SITE_CACHE_TTL,
+                        help=f"seconds robots.txt, sitemap, www redirect and CMS results are reused per host "
+                             f"(default: {SITE_CACHE_TTL})")
+    parser.add_argument('--http-cache', metavar='DIR',
+                        help="keep pages, stylesheets, robots.txt and sitemaps in DIR and revalidate them with "
+                             "conditional requests on later runs")
+    parser.add_argument('--http-cache-size', type=int, default=HTTP_CACHE_MAX_MB,
+                        help=f"maximum size of the HTTP cache in MB (default: {HTTP_CACHE_MAX_MB})")
+    parser.add_argument('--store', metavar='FILE',
+                        help="keep results in the SQLite database FILE: pages whose HTML is unchanged since the last "
+                             "audit reuse the stored result and PDF report, changed pages are compared with it")
+    parser.add_argument('--store-max-age', type=float, default=STORE_MAX_AGE_DAYS,
+                        help=f"days after which an unchanged page is audited again in full, refreshing its link, "
+                             f"stylesheet and asset checks (default: {STORE_MAX_AGE_DAYS})")
+    parser.add_argument('--exact-timing', action='store_true',
+                        help="always download the analyzed page in full, bypassing the HTTP cache, so the "
+                             "response time check measures a complete fetch")
+    parser.add_argument('--max-page-size', type=int, default=MAX_PAGE_MB,
+                        help=f"stop downloading an analyzed page after this many MB (default: {MAX_PAGE_MB})")
+    parser.add_argument('--user-agent', default=USER_AGENT, help="User-Agent header sent with every request")
+    parser.add_argument('--metrics', metavar='FILE',
+                        help="append the time, requests, bytes and errors of every analysis stage to FILE as NDJSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    session = create_session(pool_size=args.pool_size, retries=args.retries, user_agent=args.user_agent)
+    site_cache.ttl = args.site_cache_ttl
+    link_checker.per_host = args.links_per_host
+    asset_auditor.per_host = args.assets_per_host
+    http_cache = HTTPCache(args.http_cache, max_bytes=args.http_cache_size * 1024 * 1024) if args.http_cache else None
+    metrics = MetricsLog(args.metrics)
+    store = None
+    if args.store:
+        from result_store import ResultStore
+
+        store = ResultStore(args.store, max_age=args.store_max_age * 86400)
+    options = {
+        'http_cache': http_cache,
+        'exact_timing': args.exact_timing,
+        'max_page_bytes': args.max_page_size * 1024 * 1024,
+        'max_links': args.max_links,
+        'profile': args.profile or DEFAULT_PROFILE,
+        'metrics_hook': metrics,
+        'store': store,
+    }
 
-        if not visible_plugins:
-            good_results += 1
-        else:
-            recommendations += 1
-        total_items += 1
-
-        score = int((good_results / total_items) * 100) if total_items > 0 else 0
-
-        return {
-            'url': url,
-            'score': score,
-            'total_items': total_items,
-            'issues': issues,
-            'recommendations': recommendations,
-            'good_results': good_results,
-            'title': title_text,
-            'title_length': title_length,
-            'meta_description': meta_desc_text,
-            'meta_desc_length': meta_desc_length,
-            'common_keywords': common_keywords_str,
-            'keywords_title_desc': common_keywords_title_desc,
-            'h1_tags': h1_texts,
-            'h2_tags': h2_texts,
-            'images_without_alt': images_without_alt[:3],
-            'internal_links': len(internal_links),
-            'external_links': len(external_links),
-            'canonical': canonical_url,
-            'has_noindex': has_noindex,
-            'has_og_tags': has_og_tags,
-            'has_schema': has_schema,
-            'has_robots': has_robots,
-            'robots_content': robots_content,
-            'has_disallow': has_disallow,
-            'has_sitemap': has_sitemap,
-            'sitemap_count': sitemap_count,
-            'proper_canonicalization': proper_canonicalization,
-            'is_fresh': is_fresh,
-            'days_ago': days_ago,
-            'has_broken_links': has_broken,
-            'broken_count': broken_count,
-            'checked_links': checked_count,
-            'has_media_queries': has_media_queries,
-            'html_size': round(html_size, 2),
-            'total_requests': total_requests,
-            'response_time': round(response_time, 3),
-            'has_image_expires': has_image_expires,
-            'unminified_js': unminified_js[:2],
-            'unminified_css': unminified_css[:2],
-            'is_https': is_https,
-            'visible_plugins': visible_plugins,
-            'keyword_usage': keyword_usage,
-            'top_keywords': top_keywords,
-            'images': images,
-            'scripts': scripts,
-            'styles': styles
-        }
-    except Exception as e:
-        raise Exception(f"Error analyzing URL: {str(e)}")
+    render_processes = args.render_processes
+    if render_processes is None:
+        render_processes = os.cpu_count() if (os.cpu_count() or 1) > 1 else 0
 
+    def results_file(name):
+        return args.output or os.path.join(args.output_dir, f"{name}.{args.format}")
 
-def generate_pdf(data, output_file):
-    doc = SimpleDocTemplate(output_file, pagesize=letter, topMargin=0.5 * inch, bottomMargin=0.5 * inch,
-                            leftMargin=0.5 * inch, rightMargin=0.5 * inch)
-    styles = getSampleStyleSheet()
-    story = []
+    if args.serve is not None:
+        from audit_server import AuditService, serve
 
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Title'],
-        fontSize=24,
-        textColor=colors.HexColor('#1a5490'),
-        spaceAfter=20,
-        alignment=TA_CENTER
-    )
+        serve(AuditService(session=session, workers=args.workers, result_ttl=args.result_ttl, **options),
+              args.host, args.serve)
+        return 0
 
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading1'],
-        fontSize=18,
-        textColor=colors.HexColor('#1a5490'),
-        spaceAfter=12,
-        spaceBefore=24
-    )
+    if args.offline:
+        from offline import run_offline
 
-    subheading_style = ParagraphStyle(
-        'CustomSubHeading',
-        parent=styles['Heading2'],
-        fontSize=14,
-        textColor=colors.black,
-        spaceAfter=8,
-        spaceBefore=12
-    )
+        with create_report_writer(args.format, results_file('foxseo-offline'), args.output_dir,
+                                  render_processes=render_processes, metrics_hook=metrics) as writer:
+            summary = run_offline(args.offline, processes=args.processes, writer=writer, base_url=args.base_url,
+                                  profile=args.profile, metrics_hook=metrics)
+        return 1 if summary['failed'] or summary.get('render', {}).get('failed') else 0
 
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=10,
-        textColor=colors.black,
-        spaceAfter=6,
-        alignment=TA_JUSTIFY
-    )
+    if args.batch:
+        with create_report_writer(args.format, results_file('foxseo-batch'), args.output_dir,
+                                  render_processes=render_processes, metrics_hook=metrics, store=store) as writer:
+            summary = run_batch(read_urls(args.batch), workers=args.workers, per_host=args.per_host,
+                                session=session, tfidf=args.tfidf, writer=writer, **options)
+        return 1 if summary['failed'] or summary.get('render', {}).get('failed') else 0
 
-    check_style = ParagraphStyle('Check', parent=normal_style, leftIndent=20)
-    box_style = ParagraphStyle('Box', parent=normal_style, backColor=colors.HexColor('#f0f0f0'), leftIndent=10,
-                               rightIndent=10, spaceBefore=5, spaceAfter=5)
-
-    story.append(Paragraph("SEO Analysis Report", title_style))
-    story.append(Spacer(1, 0.2 * inch))
-    story.append(Paragraph(escape(data['url']), styles['Normal']))
-    story.append(Paragraph(f"Generated on {datetime.now().strftime('%B %d, %Y')}", styles['Normal']))
-    story.append(PageBreak())
-
-    story.append(Paragraph("Table of Contents", heading_style))
-    toc_data = [
-        ['Overview', '3'],
-        ['Basic SEO', '4'],
-        ['Advanced SEO', '7'],
-        ['Performance', '9'],
-        ['Security', '11']
-    ]
-    toc_table = Table(toc_data, colWidths=[4 * inch, 1 * inch])
-    toc_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-    ]))
-    story.append(toc_table)
-    story.append(PageBreak())
-
-    story.append(Paragraph("Overview", heading_style))
-    story.append(Paragraph(f"A very good score is between 60 and 80. For best results, you should strive for 70 and above.", normal_style))
-    story.append(Spacer(1, 0.1 * inch))
-
-    overview_data = [
-        ['Overall Site Score', f"{data['score']}/100"],
-        ['All Items', f"{data['total_items']} of {data['total_items']}"],
-        ['Critical Issues', f"{data['issues']} of {data['total_items']}"],
-        ['Recommended', f"{data['recommendations']} of {data['total_items']}"],
-        ['Good Results', f"{data['good_results']} of {data['total_items']}"]
-    ]
-    overview_table = Table(overview_data, colWidths=[3 * inch, 2 * inch])
-    overview_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#e6f2ff')),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey)
-    ]))
-    story.append(overview_table)
-    story.append(Spacer(1, 0.3 * inch))
-
-    story.append(Paragraph("Search Preview", subheading_style))
-    story.append(Paragraph("Here is how the site may appear in search results:", normal_style))
-    story.append(Paragraph(escape(data['url']), normal_style))
-    story.append(Paragraph(escape(data['title']), normal_style))
-    story.append(Paragraph(escape(data['meta_description']), normal_style))
-    story.append(PageBreak())
-
-    story.append(Paragraph("Basic SEO", heading_style))
-
-    story.append(Paragraph("SEO Title", subheading_style))
-    status = "✓" if 50 <= data['title_length'] <= 70 else "✗"
-    story.append(Paragraph(f"{status} The SEO title is set and is {data['title_length']} characters long.", normal_style))
-    story.append(Paragraph(escape(data['title']), box_style))
-    if data['title_length'] < 50 or data['title_length'] > 70:
-        story.append(Paragraph("Ensure your page's title includes your target keywords, and design it to encourage users to click.", normal_style))
-    story.append(Spacer(1, 0.1 * inch))
-
-    story.append(Paragraph("SEO Description", subheading_style))
-    status = "✓" if 150 <= data['meta_desc_length'] <= 160 else "✗"
-    story.append(Paragraph(f"{status} The meta description is set and is {data['meta_desc_length']} characters long.", normal_style))
-    story.append(Paragraph(escape(data['meta_description']), box_style))
-    story.append(Paragraph("Write a meta description for your page. Use your target keywords (in a natural way) and write with human readers in mind.", normal_style))
-    story.append(Spacer(1, 0.1 * inch))
-
-    story.append(Paragraph("Common Keywords", subheading_style))
-    story.append(Paragraph("A list of keywords that appear frequently in the text of your content.", normal_style))
-    story.append(Paragraph(f"Here are the most common keywords we found on the page: {escape(data['common_keywords'])}", normal_style))
-    story.append(Spacer(1, 0.1 * inch))
-
-    story.append(Paragraph("Keywords in Title &amp; Description", subheading_style))
-    status = "✓" if len(data['keywords_title_desc']) > 0 else "✗"
-    story.append(Paragraph(f"{status} One or more keywords were found in the title and description of the page.", normal_style))
-    kw_table_data = [['Title:', ', '.join(data['keywords_title_desc'])],
-                     ['Description:', ', '.join(data['keywords_title_desc'][-3:])]]
-    kw_table = Table(kw_table_data, colWidths=[1 * inch, 5 * inch])
-    kw_table.setStyle(TableStyle([('ALIGN', (0, 0), (-1, -1), 'LEFT')]))
-    story.append(kw_table)
-    story.append(Paragraph("You need to use titles and descriptions that are attractive to users and contain your keywords. Use the keywords naturally.", normal_style))
-    story.append(Spacer(1, 0.1 * inch))
-
-    story.append(Paragraph("Keywords Usage Test", subheading_style))
-    usage_data = [['Keyword', 'Title tag', 'Meta description', 'Headings']]
-    for kw in data['top_keywords']:
-        row = [kw, '✓' if data['keyword_usage'][kw]['title'] else '✗',
-               '✓' if data['keyword_usage'][kw]['description'] else '✗',
-               '✓' if data['keyword_usage'][kw]['headings'] else '✗']
-        usage_data.append(row)
-    usage_table = Table(usage_data, colWidths=[1.5 * inch, 1.5 * inch, 1.5 * inch, 1.5 * inch])
-    usage_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-    ]))
-    story.append(usage_table)
-    story.append(Spacer(1, 0.1 * inch))
-
-    story.append(Paragraph("H1 Heading", subheading_style))
-    status = "✓" if len(data['h1_tags']) == 1 else "✗"
-    story.append(Paragraph(f"{status} One H1 tag was found on the page.", normal_style))
-    for h1 in data['h1_tags'][:1]:
-        story.append(Paragraph(f"• {escape(h1)}", check_style))
-    story.append(Paragraph("Ensure your most important keywords appear in the H1 tag - don't force it, use them in a natural way.", normal_style))
-    story.append(Spacer(1, 0.1 * inch))
-
-    story.append(Paragraph("H2 Headings", subheading_style))
-    status = "✓" if len(data['h2_tags']) > 0 else "✗"
-    story.append(Paragraph(f"{status} H2 tags were found on the page.", normal_style))
-    for h2 in data['h2_tags'][:7]:
-        story.append(Paragraph(f"• {escape(h2)}", check_style))
-    story.append(Paragraph("Make sure you have a good balance of H2 tags to plain text in your content.", normal_style))
-    story.append(Spacer(1, 0.1 * inch))
-
-    story.append(Paragraph("Image ALT Attributes", subheading_style))
-    status = "✓" if len(data['images_without_alt']) == 0 else "✗"
-    alt_count = len(data['images_without_alt'])
-    if status == '✓':
-        alt_message = 'All images on the page have alt attributes.'
-    else:
-        alt_message = f'Some images on the page have no alt attribute. ({alt_count})'
-    story.append(Paragraph(f"{status} {alt_message}", normal_style))
-    if data['images_without_alt']:
-        for img in data['images_without_alt']:
-            story.append(Paragraph(f"URL: {escape(img)}", check_style))
-        story.append(Paragraph("Make sure every image has an alt tag, and add useful descriptions to each image.", normal_style))
-    story.append(Spacer(1, 0.1 * inch))
-
-    story.append(Paragraph("Links Ratio", subheading_style))
-    status = "✓"
-    story.append(Paragraph(f"{status} The page has a correct number of internal and external links.", normal_style))
-    links_data = [['Internal:', str(data['internal_links'])], ['External:', str(data['external_links'])]]
-    links_table = Table(links_data, colWidths=[1 * inch, 5 * inch])
-    story.append(links_table)
-    story.append(Paragraph("Add links to external resources that are useful for your readers.", normal_style))
-    story.append(Spacer(1, 0.1 * inch))
-
-    story.append(Paragraph("Create a responsive site", subheading_style))
-    status = "✓" if data['has_media_queries'] else "✗"
-    story.append(Paragraph(f"{status} Our analysis of the use of CSS media queries in your content.", normal_style))
-    if data['has_media_queries']:
-        story.append(Paragraph("The CSS code contains media queries.", normal_style))
-    else:
-        story.append(Paragraph("No media queries found. Consider adding responsive design for better mobile experience.", normal_style))
-    story.append(Spacer(1, 0.3 * inch))
-
-    story.append(PageBreak())
-
-    story.append(Paragraph("Advanced SEO", heading_style))
-
-    story.append(Paragraph("Canonical Tag", subheading_style))
-    status = "✓" if data['canonical'] else "✗"
-    story.append(Paragraph(f"{status} The page is using the canonical link tag.", normal_style))
-    if data['canonical']:
-        story.append(Paragraph(escape(data['canonical']), box_style))
-    story.append(Paragraph("Every page on your site should have a &lt;link&gt; tag with a 'rel=\"canonical\"' attribute.", normal_style))
-    story.append(Spacer(1, 0.1 * inch))
-
-    story.append(Paragraph("Noindex Meta", subheading_style))
-    status = "✓" if not data['has_noindex'] else "✗"
-    noindex_msg = 'does not contain' if not data['has_noindex'] else 'contains'
-    story.append(Paragraph(f"{status} The page {noindex_msg} any noindex header or meta tag.", normal_style))
-    story.append(Paragraph("Only ever use noindex meta tag or header on pages you want to keep out of the reach of search engines!", normal_style))
-    story.append(Spacer(1, 0.1 * inch))
-
-    story.append(Paragraph("WWW Canonicalization", subheading_style))
-    status = "✓" if data['proper_canonicalization'] else "✗"
-    story.append(Paragraph(f"{status} Both www and non-www versions of the URL are redirected to the same site.", normal_style))
-    if not data['proper_canonicalization']:
-        story.append(Paragraph("Decide whether you want your site's URLs to include a 'www', or if you prefer a plain domain name. Use 301 redirects.", normal_style))
-    story.append(Spacer(1, 0.1 * inch))
-
-    story.append(Paragraph("OpenGraph Meta", subheading_style))
-    status = "✓" if data['has_og_tags'] else "✗"
-    story.append(Paragraph(f"{status} All the required Open Graph meta tags have been found.", normal_style))
-    if not data['has_og_tags']:
-        story.append(Paragraph("Insert a customized Open Graph meta tag for each important page on your site.", normal_style))
-    story.append(Spacer(1, 0.1 * inch))
-
-    story.append(Paragraph("Schema Meta Data", subheading_style))
-    status = "✓" if data['has_schema'] else "✗"
-    story.append(Paragraph(f"{status} We found Schema.org data on the page.", normal_style))
-    if not data['has_schema']:
-        story.append(Paragraph("AIOSEO makes it extremely easy to add highly relevant Schema.org markup to your site.", normal_style))
-    story.append(Spacer(1, 0.1 * inch))
-
-    story.append(Paragraph("Sitemaps", subheading_style))
-    status = "✓" if data['has_sitemap'] else "✗"
-    sitemap_msg = 'one or more sitemaps.' if data['has_sitemap'] else 'no sitemap.'
-    story.append(Paragraph(f"{status} The site has {sitemap_msg}", normal_style))
-    if data['has_sitemap']:
-        story.append(Paragraph(f"Found {data['sitemap_count']} URLs in sitemap.", normal_style))
-    else:
-        story.append(Paragraph("Consider generating an XML sitemap to help search engines crawl your site.", normal_style))
-    story.append(Spacer(1, 0.1 * inch))
-
-    story.append(Paragraph("Robots.txt", subheading_style))
-    status = "✓" if data['has_robots'] else "✗"
-    story.append(Paragraph(f"{status} The site has a robots.txt file.", normal_style))
-    if data['has_robots']:
-        disallow_msg = 'which includes one or more Disallow: directives.' if data['has_disallow'] else 'with no Disallow directives.'
-        story.append(Paragraph(disallow_msg, normal_style))
-        story.append(Paragraph(escape(data['robots_content'][:300]), box_style))
-        story.append(Paragraph("Make sure that you only block parts you don't want to be indexed.", normal_style))
-    else:
-        story.append(Paragraph("Create a robots.txt file and upload it to your site's web root.", normal_style))
-    story.append(Spacer(1, 0.1 * inch))
-
-    story.append(Paragraph("Keep your content fresh", subheading_style))
-    status = "✓" if data['is_fresh'] else "✗"
-    story.append(Paragraph(f"{status} The content is fresh. Last updated on {datetime.now().strftime('%Y-%m-%d')} ({data['days_ago']} days ago).", normal_style))
-    if not data['is_fresh']:
-        story.append(Paragraph("Update your content regularly to signal freshness to search engines.", normal_style))
-    story.append(Spacer(1, 0.1 * inch))
-
-    story.append(Paragraph("Broken Links", subheading_style))
-    status = "✓" if not data['has_broken_links'] else "✗"
-    if not data['has_broken_links']:
-        broken_msg = 'No broken links on the page.'
-    else:
-        broken_msg = f"{data['broken_count']}/{data['checked_links']} broken links detected."
-    story.append(Paragraph(f"{status} {broken_msg}", normal_style))
-    if data['has_broken_links']:
-        story.append(Paragraph("Detects broken or dead links (404/500 errors) in the website that may harm SEO and user trust. Fix them promptly.", normal_style))
-    story.append(Spacer(1, 0.3 * inch))
-
-    story.append(PageBreak())
-
-    story.append(Paragraph("Performance", heading_style))
-
-    story.append(Paragraph("Page Size", subheading_style))
-    status = "✗" if data['html_size'] > 50 else "✓"
-    story.append(Paragraph(f"{status} The size of the HTML document is {data['html_size']} KB.", normal_style))
-    if data['html_size'] > 50:
-        story.append(Paragraph("This is over our recommendation of 50 KB. Remove unnecessary tags, inline CSS, and white space.", normal_style))
-    story.append(Spacer(1, 0.1 * inch))
-
-    story.append(Paragraph("Response Time", subheading_style))
-    status = "✓" if data['response_time'] < 0.8 else "✗"
-    story.append(Paragraph(f"{status} The response time is under 0.8 seconds which is great.", normal_style))
-    if data['response_time'] >= 0.8:
-        story.append(Paragraph("Use a caching plugin or CDN to improve response time.", normal_style))
-    story.append(Spacer(1, 0.1 * inch))
-
-    story.append(Paragraph("Image Headers Expire", subheading_style))
-    status = "✗" if not data['has_image_expires'] else "✓"
-    expire_msg = 'using' if data['has_image_expires'] else 'not using'
-    story.append(Paragraph(f"{status} The server is {expire_msg} expires header for the images.", normal_style))
-    if not data['has_image_expires']:
-        story.append(Paragraph("Edit server config or use a plugin to set expires headers for images.", normal_style))
-    story.append(Spacer(1, 0.1 * inch))
-
-    story.append(Paragraph("Minify CSS", subheading_style))
-    status = "✓" if not data['unminified_css'] else "✗"
-    story.append(Paragraph(f"{status} All CSS files appear to be minified.", normal_style))
-    if data['unminified_css']:
-        for css in data['unminified_css']:
-            story.append(Paragraph(f"• {escape(css)}", check_style))
-        story.append(Paragraph("Use server-side tools to automatically minify CSS files.", normal_style))
-    story.append(Spacer(1, 0.1 * inch))
-
-    story.append(Paragraph("Page Objects", subheading_style))
-    status = "✗" if data['total_requests'] > 20 else "✓"
-    story.append(Paragraph(f"{status} The page makes {data['total_requests']} requests.", normal_style))
-    obj_data = [['Total:', str(data['total_requests'])], ['Images:', str(len(data['images']))],
-                ['JavaScript:', str(len(data['scripts']))],
-                ['Stylesheets:', str(len(data['styles']))]]
-    obj_table = Table(obj_data, colWidths=[1 * inch, 5 * inch])
-    story.append(obj_table)
-    if data['total_requests'] > 20:
-        story.append(Paragraph("More than 20 requests can result in slow page loading. Try to replace embedded objects with HTML5 alternatives.", normal_style))
-    story.append(Spacer(1, 0.1 * inch))
-
-    story.append(Paragraph("Minify Javascript", subheading_style))
-    status = "✓" if not data['unminified_js'] else "✗"
-    js_msg = 'All' if status == '✓' else 'Some'
-    js_msg2 = 'are' if status == '✓' else "don't seem to be"
-    story.append(Paragraph(f"{status} {js_msg} Javascript files {js_msg2} minified.", normal_style))
-    if data['unminified_js']:
-        for js in data['unminified_js']:
-            story.append(Paragraph(f"• {escape(js)}", check_style))
-    story.append(Paragraph("There are server-side tools to automatically minify JavaScript files.", normal_style))
-    story.append(Spacer(1, 0.1 * inch))
-
-    story.append(Paragraph("Mobile Speed", subheading_style))
-    story.append(Paragraph("✓ The page performance is acceptable but could be improved in some areas.", normal_style))
-    story.append(Spacer(1, 0.3 * inch))
-
-    story.append(PageBreak())
-
-    story.append(Paragraph("Security", heading_style))
-
-    story.append(Paragraph("Theme Visibility", subheading_style))
-    story.append(Paragraph("The theme is not publicly visible, so it is not easily identifiable.", normal_style))
-    story.append(Spacer(1, 0.1 * inch))
-
-    story.append(Paragraph("Visible Plugins", subheading_style))
-    status = "✓" if not data['visible_plugins'] else "✗"
-    plugin_msg = 'Hurray! None of the plugins are publicly visible.' if not data['visible_plugins'] else 'Some plugins may be visible.'
-    story.append(Paragraph(plugin_msg, normal_style))
-    if data['visible_plugins']:
-        story.append(Paragraph("Hide plugin paths to improve security.", normal_style))
-    story.append(Spacer(1, 0.1 * inch))
-
-    story.append(Paragraph("Directory Listing", subheading_style))
-    story.append(Paragraph("✓ Directory Listing seems to be disabled on the server.", normal_style))
-    story.append(Spacer(1, 0.1 * inch))
-
-    story.append(Paragraph("Secure Connection", subheading_style))
-    status = "✓" if data['is_https'] else "✗"
-    story.append(Paragraph(f"{status} The site is using a secure transfer protocol (https).", normal_style))
-    if not data['is_https']:
-        story.append(Paragraph("If you aren't using an SSL certificate, you are losing potential traffic. Get one installed immediately.", normal_style))
-
-    doc.build(story)
-
-
-def main():
-    url = input("Enter URL to analyze: ").strip()
+    url = args.url or input("Enter URL to analyze: ")
+    url = normalize_input_url(url)
 
-    if not url.startswith(('http://', 'https://')):
-        url = 'https://' + url
+    if args.crawl:
+        with create_report_writer(args.format, results_file('foxseo-crawl'), args.output_dir,
+                                  render_processes=render_processes, metrics_hook=metrics, store=store) as writer:
+            summary = crawl_site(url, max_pages=args.max_pages, max_depth=args.max_depth, workers=args.workers,
+                                 session=session, use_sitemap=not args.no_sitemap,
+                                 respect_robots=not args.ignore_robots, tfidf=args.tfidf, writer=writer, **options)
+        return 1 if summary['failed'] or summary.get('render', {}).get('failed') else 0
 
     print(f"\nAnalyzing {url}...")
 
     try:
-        data = analyze_seo(url)
-
-        domain = urlparse(url).netloc.replace('www.', '').replace('.', '')
-        output_file = f"foxseo-{domain}.pdf"
+        data = analyze_seo(url, session=session, **options)
 
-        generate_pdf(data, output_file)
+        output = args.output or report_filename(url, args.output_dir, args.format)
+        with create_report_writer(args.format, output, args.output_dir, array=False, metrics_hook=metrics,
+                                  store=store) as writer:
+            output_file = writer.write(data)
 
         print(f"\nAnalysis complete!")
-        print(f"SEO Score: {data['score']}/100")
+        print(f"SEO Score: {data.score}/100")
+        if data.reused:
+            print(f"Unchanged since the audit of {data.previous_audit}, the stored result was reused")
+        if data.diff:
+            print(f"Since the audit of {data.previous_audit}: {describe_diff(data.diff)}")
+        if data.skipped_checks:
+            print(f"Not checked in the {data.profile} profile: {', '.join(data.skipped_checks)}")
         print(f"Report saved to: {output_file}")
+        print_http_stats(session_stats(session))
+        if data.process_peak_rss_mb is not None:
+            print(f"Peak memory of the process (RSS): {data.process_peak_rss_mb} MB")
+        print_stage_stats(data.stages)
 
     except Exception as e:
         print(f"\nError: {str(e)}")
+        return 1
+    return 0
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,234 @@
+import base64
+import concurrent.futures
+import gzip
+import io
+import json
+import mmap
+import os
+import time
+import zlib
+from concurrent.futures import wait, FIRST_COMPLETED
+from datetime import datetime, timezone
+from itertools import islice
+from urllib.parse import urljoin
+
+from main import (
+    HTML_EXTENSIONS, MAX_PAGE_MB, OFFLINE_BATCH_SIZE, PdfReportWriter, analyze_html, multiprocessing,
+    notify_metrics, print_batch_summary, requests, run_summary)
+
+
+def read_header_block(stream):
+    headers = requests.structures.CaseInsensitiveDict()
+    while True:
+        line = stream.readline()
+        if not line.strip():
+            return headers
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip()] = value.strip()
+
+
+def decode_chunked(body):
+    parts = []
+    position = 0
+    while position < len(body):
+        line_end = body.index(b'\r\n', position)
+        size = int(body[position:line_end].split(b';', 1)[0], 16)
+        if size == 0:
+            break
+        parts.append(body[line_end + 2:line_end + 2 + size])
+        position = line_end + 4 + size
+    return b''.join(parts)
+
+
+def parse_http_response(block, max_bytes=MAX_PAGE_MB * 1024 * 1024):
+    stream = io.BytesIO(block)
+    status_line = stream.readline().split(None, 2)
+    status = int(status_line[1]) if len(status_line) > 1 and status_line[1].isdigit() else 0
+    headers = read_header_block(stream)
+    body = stream.read()
+    if 'chunked' in headers.pop('Transfer-Encoding', '').lower():
+        body = decode_chunked(body)
+    encoding = headers.pop('Content-Encoding', '').lower()
+    if encoding in ('gzip', 'x-gzip', 'deflate'):
+        try:
+            body = zlib.decompressobj(47).decompress(body, max_bytes)
+        except zlib.error:
+            # Many servers send "deflate" as a raw deflate stream without the zlib wrapper.
+            if encoding != 'deflate':
+                raise
+            body = zlib.decompressobj(-15).decompress(body, max_bytes)
+    elif encoding not in ('', 'identity'):
+        raise ValueError(f"unsupported content encoding: {encoding}")
+    headers.pop('Content-Length', None)
+    return status, headers, body
+
+
+def parse_capture_time(value):
+    try:
+        captured = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (AttributeError, ValueError):
+        return None
+    if captured.tzinfo is not None:
+        captured = captured.astimezone(timezone.utc).replace(tzinfo=None)
+    return captured
+
+
+def iter_warc_pages(path, on_error=None):
+    with open(path, 'rb') as raw:
+        if path.lower().endswith('.gz'):
+            stream = gzip.GzipFile(fileobj=raw)
+        elif os.fstat(raw.fileno()).st_size:
+            stream = mmap.mmap(raw.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            return
+        try:
+            while True:
+                line = stream.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                if not line.startswith(b'WARC/'):
+                    raise ValueError(f"not a WARC record: {line[:40]!r}")
+                record = read_header_block(stream)
+                block = stream.read(int(record.get('Content-Length', 0)))
+                if record.get('WARC-Type') != 'response' or 'application/http' not in record.get('Content-Type', ''):
+                    continue
+                url = record.get('WARC-Target-URI', '').strip('<>')
+                try:
+                    status, headers, body = parse_http_response(block)
+                except (ValueError, zlib.error) as e:
+                    if on_error is None:
+                        raise
+                    on_error(f"{path} ({url})", str(e))
+                    continue
+                if status == 200 and 'html' in headers.get('Content-Type', 'text/html'):
+                    yield url, dict(headers), body, None, parse_capture_time(record.get('WARC-Date'))
+        finally:
+            stream.close()
+
+
+def iter_har_pages(path, on_error=None):
+    with open(path, encoding='utf-8') as stream:
+        har = json.load(stream)
+    for entry in har.get('log', {}).get('entries', []):
+        response = entry.get('response', {})
+        content = response.get('content', {})
+        if response.get('status') != 200 or 'html' not in content.get('mimeType', '') or content.get('text') is None:
+            continue
+        headers = requests.structures.CaseInsensitiveDict({header['name']: header['value'] for header in response.get('headers', [])})
+        for name in ('Content-Encoding', 'Content-Length', 'Transfer-Encoding'):
+            headers.pop(name, None)
+        if content.get('encoding') == 'base64':
+            try:
+                body = base64.b64decode(content['text'])
+            except ValueError as e:
+                if on_error is None:
+                    raise
+                on_error(f"{path} ({entry.get('request', {}).get('url', '')})", str(e))
+                continue
+        else:
+            body = content['text'].encode('utf-8')
+            headers['Content-Type'] = 'text/html; charset=utf-8'
+        elapsed = entry.get('time')
+        response_time = elapsed / 1000 if isinstance(elapsed, (int, float)) and elapsed >= 0 else None
+        yield (entry.get('request', {}).get('url', ''), dict(headers), body, response_time,
+               parse_capture_time(entry.get('startedDateTime')))
+
+
+def iter_html_file(path, base_url=None, root=None):
+    with open(path, 'rb') as stream:
+        body = stream.read()
+    if base_url:
+        url = urljoin(base_url, os.path.relpath(path, root or os.path.dirname(path)).replace(os.sep, '/'))
+    else:
+        url = 'file://' + os.path.abspath(path).replace(os.sep, '/')
+    yield url, {}, body, None, None
+
+
+def iter_offline_pages(paths, base_url=None, on_error=None):
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(os.path.join(directory, name) for directory, _, names in os.walk(path) for name in names)
+            root = path
+        else:
+            files = [path]
+            root = None
+        for file_path in files:
+            name = file_path.lower()
+            if name.endswith(('.warc', '.warc.gz')):
+                pages = iter_warc_pages(file_path, on_error)
+            elif name.endswith('.har'):
+                pages = iter_har_pages(file_path, on_error)
+            elif name.endswith(HTML_EXTENSIONS):
+                pages = iter_html_file(file_path, base_url, root)
+            else:
+                continue
+            try:
+                yield from pages
+            except Exception as e:
+                if on_error is None:
+                    raise
+                on_error(file_path, str(e))
+
+
+def analyze_offline_batch(pages, profile=None):
+    results = []
+    for url, headers, body, response_time, captured in pages:
+        try:
+            results.append((url, analyze_html(body, url, headers, response_time, profile=profile, now=captured), None))
+        except Exception as e:
+            results.append((url, None, str(e)))
+    return results
+
+
+def run_offline(paths, processes=None, output_dir='.', writer=None, base_url=None, profile=None,
+                batch_size=OFFLINE_BATCH_SIZE, metrics_hook=None):
+    processes = processes if processes is not None else os.cpu_count() or 1
+    writer = writer or PdfReportWriter(output_dir)
+    succeeded = 0
+    failures = []
+    started = time.time()
+
+    def source_failed(path, error):
+        failures.append((path, error))
+        print(f"[failed] {path}: {error}")
+
+    def handle(results):
+        nonlocal succeeded
+        for url, result, error in results:
+            try:
+                if error is not None:
+                    raise Exception(error)
+                output_file = writer.write(result)
+                notify_metrics(metrics_hook, url, result.stages)
+                succeeded += 1
+                print(f"[ok] {url} -> {result.score}/100 ({output_file})")
+            except Exception as e:
+                failures.append((url, str(e)))
+                print(f"[failed] {url}: {str(e)}")
+
+    pages = iter_offline_pages(paths, base_url, on_error=source_failed)
+    batches = iter(lambda: list(islice(pages, batch_size)), [])
+    try:
+        if processes <= 1:
+            for batch in batches:
+                handle(analyze_offline_batch(batch, profile))
+        else:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=processes,
+                                                        mp_context=multiprocessing.get_context('spawn')) as pool:
+                pending = set()
+                for batch in batches:
+                    pending.add(pool.submit(analyze_offline_batch, batch, profile))
+                    if len(pending) >= processes * 2:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            handle(future.result())
+                for future in pending:
+                    handle(future.result())
+    finally:
+        writer.drain()
+
+    summary = run_summary(started, succeeded, failures, None, {'metrics_hook': metrics_hook}, writer)
+    print_batch_summary(summary, label='Offline analysis')
+    return summary
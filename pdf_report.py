@@ -0,0 +1,527 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from xml.sax.saxutils import escape
+
+from reportlab.lib.pagesizes import letter
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.pdfgen.canvas import Canvas
+from reportlab.platypus import SimpleDocTemplate, Flowable, Paragraph, Spacer, Table, TableStyle, PageBreak
+from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
+
+
+class _DeferredCanvas(Canvas):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.deferred = {}
+        self._page_states = []
+
+    def showPage(self):
+        self._page_states.append(dict(self.__dict__))
+        self._startPage()
+
+    def save(self):
+        for page_number, state in enumerate(self._page_states, 1):
+            self.__dict__.update(state)
+            for draw in self.deferred.get(page_number, ()):
+                draw(self)
+            Canvas.showPage(self)
+        Canvas.save(self)
+
+
+class _TocEntry(Flowable):
+    def __init__(self, title, pages, font='Helvetica', size=10, number_offset=4 * inch, padding=6):
+        super().__init__()
+        self.title = title
+        self.pages = pages
+        self.font = font
+        self.size = size
+        self.number_offset = number_offset
+        self.padding = padding
+
+    def wrap(self, available_width, available_height):
+        return self.number_offset + 1 * inch, self.size + self.padding + 2
+
+    def draw(self):
+        self.canv.setFont(self.font, self.size)
+        self.canv.drawString(self.padding, self.padding / 2, self.title)
+        x, y = self.canv.absolutePosition(self.number_offset + self.padding, self.padding / 2)
+        title, pages, font, size = self.title, self.pages, self.font, self.size
+
+        def draw_page_number(canvas):
+            canvas.saveState()
+            canvas.setFont(font, size)
+            canvas.drawString(x, y, str(pages.get(title, '')))
+            canvas.restoreState()
+
+        self.canv.deferred.setdefault(self.canv.getPageNumber(), []).append(draw_page_number)
+
+
+class _ReportDocTemplate(SimpleDocTemplate):
+    def __init__(self, filename, section_style, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.section_style = section_style
+        self.section_pages = {}
+
+    def afterFlowable(self, flowable):
+        if isinstance(flowable, Paragraph) and flowable.style is self.section_style:
+            self.section_pages.setdefault(flowable.getPlainText(), self.page)
+
+
+class ReportRenderer:
+    TOC_SECTIONS = ('Overview', 'Basic SEO', 'Advanced SEO', 'Performance', 'Security')
+
+    def __init__(self):
+        self.styles = getSampleStyleSheet()
+
+        self.title_style = ParagraphStyle(
+            'CustomTitle',
+            parent=self.styles['Title'],
+            fontSize=24,
+            textColor=colors.HexColor('#1a5490'),
+            spaceAfter=20,
+            alignment=TA_CENTER
+        )
+
+        self.heading_style = ParagraphStyle(
+            'CustomHeading',
+            parent=self.styles['Heading1'],
+            fontSize=18,
+            textColor=colors.HexColor('#1a5490'),
+            spaceAfter=12,
+            spaceBefore=24
+        )
+
+        self.subheading_style = ParagraphStyle(
+            'CustomSubHeading',
+            parent=self.styles['Heading2'],
+            fontSize=14,
+            textColor=colors.black,
+            spaceAfter=8,
+            spaceBefore=12
+        )
+
+        self.normal_style = ParagraphStyle(
+            'CustomNormal',
+            parent=self.styles['Normal'],
+            fontSize=10,
+            textColor=colors.black,
+            spaceAfter=6,
+            alignment=TA_JUSTIFY
+        )
+
+        self.check_style = ParagraphStyle('Check', parent=self.normal_style, leftIndent=20)
+        self.box_style = ParagraphStyle('Box', parent=self.normal_style, backColor=colors.HexColor('#f0f0f0'), leftIndent=10,
+                                        rightIndent=10, spaceBefore=5, spaceAfter=5)
+
+        self.overview_table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#e6f2ff')),
+            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey)
+        ])
+        self.keywords_table_style = TableStyle([('ALIGN', (0, 0), (-1, -1), 'LEFT')])
+        self.usage_table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ])
+        self.rendered = 0
+        self.render_time = 0.0
+        self.last_render_time = None
+        self._lock = threading.Lock()
+
+    def render(self, data, output_file):
+        started = time.perf_counter()
+        doc = _ReportDocTemplate(output_file, self.heading_style, pagesize=letter, topMargin=0.5 * inch,
+                                 bottomMargin=0.5 * inch, leftMargin=0.5 * inch, rightMargin=0.5 * inch)
+        doc.build(self._story(data, doc.section_pages), canvasmaker=_DeferredCanvas)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.rendered += 1
+            self.render_time += elapsed
+            self.last_render_time = elapsed
+        return elapsed
+
+    def stats(self):
+        with self._lock:
+            return {'rendered': self.rendered, 'render_seconds': round(self.render_time, 3),
+                    'last_render_seconds': self.last_render_time}
+
+    def _story(self, data, section_pages):
+        styles = self.styles
+        title_style = self.title_style
+        heading_style = self.heading_style
+        subheading_style = self.subheading_style
+        normal_style = self.normal_style
+        check_style = self.check_style
+        box_style = self.box_style
+        story = []
+
+        def not_checked(value):
+            if value is not None:
+                return False
+            story.append(Paragraph(f"– Not checked in the {data.profile} audit profile.", normal_style))
+            story.append(Spacer(1, 0.1 * inch))
+            return True
+
+        story.append(Paragraph("SEO Analysis Report", title_style))
+        story.append(Spacer(1, 0.2 * inch))
+        story.append(Paragraph(escape(data.url), styles['Normal']))
+        story.append(Paragraph(f"Generated on {datetime.now().strftime('%B %d, %Y')}", styles['Normal']))
+        story.append(PageBreak())
+
+        story.append(Paragraph("Table of Contents", heading_style))
+        for index, section in enumerate(self.TOC_SECTIONS):
+            story.append(_TocEntry(section, section_pages, 'Helvetica-Bold' if index == 0 else 'Helvetica'))
+        story.append(PageBreak())
+
+        story.append(Paragraph("Overview", heading_style))
+        story.append(Paragraph(f"A very good score is between 60 and 80. For best results, you should strive for 70 and above.", normal_style))
+        story.append(Spacer(1, 0.1 * inch))
+
+        overview_data = [
+            ['Overall Site Score', f"{data.score}/100"],
+            ['All Items', f"{data.total_items} of {data.total_items}"],
+            ['Critical Issues', f"{data.issues} of {data.total_items}"],
+            ['Recommended', f"{data.recommendations} of {data.total_items}"],
+            ['Good Results', f"{data.good_results} of {data.total_items}"]
+        ]
+        if data.skipped_checks:
+            overview_data.append(['Not Checked', f"{len(data.skipped_checks)} ({data.profile} profile)"])
+        overview_table = Table(overview_data, colWidths=[3 * inch, 2 * inch])
+        overview_table.setStyle(self.overview_table_style)
+        story.append(overview_table)
+        story.append(Spacer(1, 0.3 * inch))
+
+        if data.diff:
+            before, after = data.diff['score']
+            story.append(Paragraph("Changes Since the Last Audit", subheading_style))
+            story.append(Paragraph(f"Compared with the audit of {escape(data.previous_audit)}, the score went from "
+                                   f"{before}/100 to {after}/100.", normal_style))
+            if data.diff['checks']:
+                changes_data = [['Check', 'Before', 'Now']]
+                changes_data += [[name.replace('_', ' ').capitalize(), before or 'not checked', after or 'not checked']
+                                 for name, (before, after) in data.diff['checks'].items()]
+                changes_table = Table(changes_data, colWidths=[2.5 * inch, 1.5 * inch, 1.5 * inch])
+                changes_table.setStyle(self.overview_table_style)
+                story.append(changes_table)
+            else:
+                story.append(Paragraph("No check changed its result.", normal_style))
+            story.append(Spacer(1, 0.3 * inch))
+
+        story.append(Paragraph("Search Preview", subheading_style))
+        story.append(Paragraph("Here is how the site may appear in search results:", normal_style))
+        story.append(Paragraph(escape(data.url), normal_style))
+        story.append(Paragraph(escape(data.title), normal_style))
+        story.append(Paragraph(escape(data.meta_description), normal_style))
+        story.append(PageBreak())
+
+        story.append(Paragraph("Basic SEO", heading_style))
+
+        story.append(Paragraph("SEO Title", subheading_style))
+        status = "✓" if 50 <= data.title_length <= 70 else "✗"
+        story.append(Paragraph(f"{status} The SEO title is set and is {data.title_length} characters long.", normal_style))
+        story.append(Paragraph(escape(data.title), box_style))
+        if data.title_length < 50 or data.title_length > 70:
+            story.append(Paragraph("Ensure your page's title includes your target keywords, and design it to encourage users to click.", normal_style))
+        story.append(Spacer(1, 0.1 * inch))
+
+        story.append(Paragraph("SEO Description", subheading_style))
+        status = "✓" if 150 <= data.meta_desc_length <= 160 else "✗"
+        story.append(Paragraph(f"{status} The meta description is set and is {data.meta_desc_length} characters long.", normal_style))
+        story.append(Paragraph(escape(data.meta_description), box_style))
+        story.append(Paragraph("Write a meta description for your page. Use your target keywords (in a natural way) and write with human readers in mind.", normal_style))
+        story.append(Spacer(1, 0.1 * inch))
+
+        story.append(Paragraph("Common Keywords", subheading_style))
+        story.append(Paragraph("A list of keywords that appear frequently in the text of your content.", normal_style))
+        story.append(Paragraph(f"Here are the most common keywords we found on the page: {escape(data.common_keywords)}", normal_style))
+        story.append(Spacer(1, 0.1 * inch))
+
+        story.append(Paragraph("Keywords in Title &amp; Description", subheading_style))
+        status = "✓" if len(data.keywords_title_desc) > 0 else "✗"
+        story.append(Paragraph(f"{status} One or more keywords were found in the title and description of the page.", normal_style))
+        kw_table_data = [['Title:', ', '.join(data.keywords_title_desc)],
+                         ['Description:', ', '.join(data.keywords_title_desc[-3:])]]
+        kw_table = Table(kw_table_data, colWidths=[1 * inch, 5 * inch])
+        kw_table.setStyle(self.keywords_table_style)
+        story.append(kw_table)
+        story.append(Paragraph("You need to use titles and descriptions that are attractive to users and contain your keywords. Use the keywords naturally.", normal_style))
+        story.append(Spacer(1, 0.1 * inch))
+
+        story.append(Paragraph("Keywords Usage Test", subheading_style))
+        usage_data = [['Keyword', 'Title tag', 'Meta description', 'Headings']]
+        for kw in data.top_keywords:
+            row = [kw, '✓' if data.keyword_usage[kw]['title'] else '✗',
+                   '✓' if data.keyword_usage[kw]['description'] else '✗',
+                   '✓' if data.keyword_usage[kw]['headings'] else '✗']
+            usage_data.append(row)
+        usage_table = Table(usage_data, colWidths=[1.5 * inch, 1.5 * inch, 1.5 * inch, 1.5 * inch])
+        usage_table.setStyle(self.usage_table_style)
+        story.append(usage_table)
+        story.append(Spacer(1, 0.1 * inch))
+
+        story.append(Paragraph("H1 Heading", subheading_style))
+        status = "✓" if data.h1_count == 1 else "✗"
+        story.append(Paragraph(f"{status} One H1 tag was found on the page.", normal_style))
+        for h1 in data.h1_tags[:1]:
+            story.append(Paragraph(f"• {escape(h1)}", check_style))
+        story.append(Paragraph("Ensure your most important keywords appear in the H1 tag - don't force it, use them in a natural way.", normal_style))
+        story.append(Spacer(1, 0.1 * inch))
+
+        story.append(Paragraph("H2 Headings", subheading_style))
+        status = "✓" if data.h2_count > 0 else "✗"
+        story.append(Paragraph(f"{status} H2 tags were found on the page.", normal_style))
+        for h2 in data.h2_tags[:7]:
+            story.append(Paragraph(f"• {escape(h2)}", check_style))
+        story.append(Paragraph("Make sure you have a good balance of H2 tags to plain text in your content.", normal_style))
+        story.append(Spacer(1, 0.1 * inch))
+
+        story.append(Paragraph("Image ALT Attributes", subheading_style))
+        status = "✓" if data.images_without_alt_count == 0 else "✗"
+        alt_count = data.images_without_alt_count
+        if status == '✓':
+            alt_message = 'All images on the page have alt attributes.'
+        else:
+            alt_message = f'Some images on the page have no alt attribute. ({alt_count})'
+        story.append(Paragraph(f"{status} {alt_message}", normal_style))
+        if data.images_without_alt:
+            for img in data.images_without_alt:
+                story.append(Paragraph(f"URL: {escape(img)}", check_style))
+            story.append(Paragraph("Make sure every image has an alt tag, and add useful descriptions to each image.", normal_style))
+        story.append(Spacer(1, 0.1 * inch))
+
+        story.append(Paragraph("Links Ratio", subheading_style))
+        status = "✓"
+        story.append(Paragraph(f"{status} The page has a correct number of internal and external links.", normal_style))
+        links_data = [['Internal:', str(data.internal_links)], ['External:', str(data.external_links)]]
+        links_table = Table(links_data, colWidths=[1 * inch, 5 * inch])
+        story.append(links_table)
+        story.append(Paragraph("Add links to external resources that are useful for your readers.", normal_style))
+        story.append(Spacer(1, 0.1 * inch))
+
+        story.append(Paragraph("Create a responsive site", subheading_style))
+        if not not_checked(data.has_media_queries):
+            status = "✓" if data.has_media_queries else "✗"
+            story.append(Paragraph(f"{status} Our analysis of the use of CSS media queries in your content.", normal_style))
+            if data.has_media_queries:
+                story.append(Paragraph("The CSS code contains media queries.", normal_style))
+            else:
+                story.append(Paragraph("No media queries found. Consider adding responsive design for better mobile experience.", normal_style))
+            story.append(Spacer(1, 0.3 * inch))
+
+        story.append(PageBreak())
+
+        story.append(Paragraph("Advanced SEO", heading_style))
+
+        story.append(Paragraph("Canonical Tag", subheading_style))
+        status = "✓" if data.canonical else "✗"
+        story.append(Paragraph(f"{status} The page is using the canonical link tag.", normal_style))
+        if data.canonical:
+            story.append(Paragraph(escape(data.canonical), box_style))
+        story.append(Paragraph("Every page on your site should have a &lt;link&gt; tag with a 'rel=\"canonical\"' attribute.", normal_style))
+        story.append(Spacer(1, 0.1 * inch))
+
+        story.append(Paragraph("Noindex Meta", subheading_style))
+        status = "✓" if not data.has_noindex else "✗"
+        noindex_msg = 'does not contain' if not data.has_noindex else 'contains'
+        story.append(Paragraph(f"{status} The page {noindex_msg} any noindex header or meta tag.", normal_style))
+        story.append(Paragraph("Only ever use noindex meta tag or header on pages you want to keep out of the reach of search engines!", normal_style))
+        story.append(Spacer(1, 0.1 * inch))
+
+        story.append(Paragraph("WWW Canonicalization", subheading_style))
+        if not not_checked(data.proper_canonicalization):
+            status = "✓" if data.proper_canonicalization else "✗"
+            story.append(Paragraph(f"{status} Both www and non-www versions of the URL are redirected to the same site.", normal_style))
+            if not data.proper_canonicalization:
+                story.append(Paragraph("Decide whether you want your site's URLs to include a 'www', or if you prefer a plain domain name. Use 301 redirects.", normal_style))
+            story.append(Spacer(1, 0.1 * inch))
+
+        story.append(Paragraph("OpenGraph Meta", subheading_style))
+        status = "✓" if data.has_og_tags else "✗"
+        story.append(Paragraph(f"{status} All the required Open Graph meta tags have been found.", normal_style))
+        if not data.has_og_tags:
+            story.append(Paragraph("Insert a customized Open Graph meta tag for each important page on your site.", normal_style))
+        story.append(Spacer(1, 0.1 * inch))
+
+        story.append(Paragraph("Schema Meta Data", subheading_style))
+        status = "✓" if data.has_schema else "✗"
+        story.append(Paragraph(f"{status} We found Schema.org data on the page.", normal_style))
+        if not data.has_schema:
+            story.append(Paragraph("AIOSEO makes it extremely easy to add highly relevant Schema.org markup to your site.", normal_style))
+        story.append(Spacer(1, 0.1 * inch))
+
+        story.append(Paragraph("Sitemaps", subheading_style))
+        if not not_checked(data.has_sitemap):
+            status = "✓" if data.has_sitemap else "✗"
+            sitemap_msg = 'one or more sitemaps.' if data.has_sitemap else 'no sitemap.'
+            story.append(Paragraph(f"{status} The site has {sitemap_msg}", normal_style))
+            if data.has_sitemap:
+                story.append(Paragraph(f"Found {data.sitemap_count} URLs in sitemap.", normal_style))
+            else:
+                story.append(Paragraph("Consider generating an XML sitemap to help search engines crawl your site.", normal_style))
+            story.append(Spacer(1, 0.1 * inch))
+
+        story.append(Paragraph("Robots.txt", subheading_style))
+        if not not_checked(data.has_robots):
+            status = "✓" if data.has_robots else "✗"
+            story.append(Paragraph(f"{status} The site has a robots.txt file.", normal_style))
+            if data.has_robots:
+                disallow_msg = 'which includes one or more Disallow: directives.' if data.has_disallow else 'with no Disallow directives.'
+                story.append(Paragraph(disallow_msg, normal_style))
+                story.append(Paragraph(escape(data.robots_content[:300]), box_style))
+                story.append(Paragraph("Make sure that you only block parts you don't want to be indexed.", normal_style))
+            else:
+                story.append(Paragraph("Create a robots.txt file and upload it to your site's web root.", normal_style))
+            story.append(Spacer(1, 0.1 * inch))
+
+        story.append(Paragraph("Keep your content fresh", subheading_style))
+        status = "✓" if data.is_fresh else "✗"
+        story.append(Paragraph(f"{status} The content is fresh. Last updated on {(datetime.now() - timedelta(days=data.days_ago)).strftime('%Y-%m-%d')} ({data.days_ago} days ago).", normal_style))
+        if not data.is_fresh:
+            story.append(Paragraph("Update your content regularly to signal freshness to search engines.", normal_style))
+        story.append(Spacer(1, 0.1 * inch))
+
+        story.append(Paragraph("Broken Links", subheading_style))
+        if not not_checked(data.has_broken_links):
+            status = "✓" if not data.has_broken_links else "✗"
+            if not data.has_broken_links:
+                broken_msg = 'No broken links on the page.'
+            else:
+                broken_msg = f"{data.broken_count}/{data.checked_links} broken links detected."
+            story.append(Paragraph(f"{status} {broken_msg}", normal_style))
+            for link_url, link_status in data.broken_links[:10]:
+                reason = link_status if link_status is not None else 'no response'
+                story.append(Paragraph(f"• {escape(link_url)} ({reason})", check_style))
+            if len(data.broken_links) > 10:
+                story.append(Paragraph(f"• … and {len(data.broken_links) - 10} more", check_style))
+            if data.has_broken_links:
+                story.append(Paragraph("Detects broken or dead links (404/500 errors) in the website that may harm SEO and user trust. Fix them promptly.", normal_style))
+            story.append(Spacer(1, 0.3 * inch))
+
+        story.append(PageBreak())
+
+        story.append(Paragraph("Performance", heading_style))
+
+        story.append(Paragraph("Page Size", subheading_style))
+        status = "✗" if data.html_size > 50 else "✓"
+        story.append(Paragraph(f"{status} The size of the HTML document is {data.html_size} KB.", normal_style))
+        if data.html_truncated:
+            story.append(Paragraph("The download was stopped at this size, so the document is even larger.", normal_style))
+        if data.html_size > 50:
+            story.append(Paragraph("This is over our recommendation of 50 KB. Remove unnecessary tags, inline CSS, and white space.", normal_style))
+        story.append(Spacer(1, 0.1 * inch))
+
+        story.append(Paragraph("Page Weight", subheading_style))
+        if not not_checked(data.page_weight):
+            story.append(Paragraph(f"The page and its {data.total_requests} images, scripts and stylesheets weigh "
+                                   f"{round(data.page_weight / 1024, 2)} KB.", normal_style))
+            if data.unknown_size_assets:
+                story.append(Paragraph(f"The size of {data.unknown_size_assets} assets is not reported by the server "
+                                       f"and is not included.", normal_style))
+            if data.heaviest_assets:
+                story.append(Paragraph("Heaviest assets:", normal_style))
+                for asset_url, size in data.heaviest_assets:
+                    story.append(Paragraph(f"• {escape(asset_url)} ({round(size / 1024, 2)} KB)", check_style))
+            story.append(Spacer(1, 0.1 * inch))
+
+        story.append(Paragraph("Response Time", subheading_style))
+        if not not_checked(data.response_time):
+            status = "✓" if data.response_time < 0.8 else "✗"
+            story.append(Paragraph(f"{status} The response time is under 0.8 seconds which is great.", normal_style))
+            if data.response_time >= 0.8:
+                story.append(Paragraph("Use a caching plugin or CDN to improve response time.", normal_style))
+            story.append(Spacer(1, 0.1 * inch))
+
+        story.append(Paragraph("Image Headers Expire", subheading_style))
+        if not not_checked(data.has_image_expires):
+            status = "✗" if not data.has_image_expires else "✓"
+            expire_msg = 'using' if data.has_image_expires else 'not using'
+            story.append(Paragraph(f"{status} The server is {expire_msg} expires header for the images.", normal_style))
+            if not data.has_image_expires:
+                story.append(Paragraph("Edit server config or use a plugin to set expires headers for images.", normal_style))
+            if data.uncached_assets:
+                story.append(Paragraph(f"{data.uncached_count} assets are served without caching headers:",
+                                       normal_style))
+                for asset_url in data.uncached_assets:
+                    story.append(Paragraph(f"• {escape(asset_url)}", check_style))
+            story.append(Spacer(1, 0.1 * inch))
+
+        story.append(Paragraph("Minify CSS", subheading_style))
+        if not not_checked(data.unminified_css):
+            status = "✓" if not data.unminified_css else "✗"
+            story.append(Paragraph(f"{status} All CSS files appear to be minified.", normal_style))
+            if data.unminified_css:
+                for css in data.unminified_css:
+                    story.append(Paragraph(f"• {escape(css)}", check_style))
+                story.append(Paragraph("Use server-side tools to automatically minify CSS files.", normal_style))
+            story.append(Spacer(1, 0.1 * inch))
+
+        story.append(Paragraph("CSS Size", subheading_style))
+        if not not_checked(data.css_bytes):
+            story.append(Paragraph(f"The page loads {round(data.css_bytes / 1024, 2)} KB of CSS from "
+                                   f"{data.css_files} stylesheets and {data.inline_styles} inline style blocks.",
+                                   normal_style))
+            story.append(Spacer(1, 0.1 * inch))
+
+        story.append(Paragraph("Page Objects", subheading_style))
+        status = "✗" if data.total_requests > 20 else "✓"
+        story.append(Paragraph(f"{status} The page makes {data.total_requests} requests.", normal_style))
+        obj_data = [['Total:', str(data.total_requests)], ['Images:', str(data.image_count)],
+                    ['JavaScript:', str(data.script_count)],
+                    ['Stylesheets:', str(data.stylesheet_count)]]
+        obj_table = Table(obj_data, colWidths=[1 * inch, 5 * inch])
+        story.append(obj_table)
+        if data.total_requests > 20:
+            story.append(Paragraph("More than 20 requests can result in slow page loading. Try to replace embedded objects with HTML5 alternatives.", normal_style))
+        story.append(Spacer(1, 0.1 * inch))
+
+        story.append(Paragraph("Minify Javascript", subheading_style))
+        status = "✓" if not data.unminified_js else "✗"
+        js_msg = 'All' if status == '✓' else 'Some'
+        js_msg2 = 'are' if status == '✓' else "don't seem to be"
+        story.append(Paragraph(f"{status} {js_msg} Javascript files {js_msg2} minified.", normal_style))
+        if data.unminified_js:
+            for js in data.unminified_js:
+                story.append(Paragraph(f"• {escape(js)}", check_style))
+        story.append(Paragraph("There are server-side tools to automatically minify JavaScript files.", normal_style))
+        story.append(Spacer(1, 0.1 * inch))
+
+        story.append(Paragraph("Mobile Speed", subheading_style))
+        story.append(Paragraph("✓ The page performance is acceptable but could be improved in some areas.", normal_style))
+        story.append(Spacer(1, 0.3 * inch))
+
+        story.append(PageBreak())
+
+        story.append(Paragraph("Security", heading_style))
+
+        story.append(Paragraph("Theme Visibility", subheading_style))
+        story.append(Paragraph("The theme is not publicly visible, so it is not easily identifiable.", normal_style))
+        story.append(Spacer(1, 0.1 * inch))
+
+        story.append(Paragraph("Visible Plugins", subheading_style))
+        if not not_checked(data.visible_plugins):
+            status = "✓" if not data.visible_plugins else "✗"
+            plugin_msg = 'Hurray! None of the plugins are publicly visible.' if not data.visible_plugins else 'Some plugins may be visible.'
+            story.append(Paragraph(plugin_msg, normal_style))
+            if data.visible_plugins:
+                story.append(Paragraph("Hide plugin paths to improve security.", normal_style))
+            story.append(Spacer(1, 0.1 * inch))
+
+        story.append(Paragraph("Directory Listing", subheading_style))
+        story.append(Paragraph("✓ Directory Listing seems to be disabled on the server.", normal_style))
+        story.append(Spacer(1, 0.1 * inch))
+
+        story.append(Paragraph("Secure Connection", subheading_style))
+        status = "✓" if data.is_https else "✗"
+        story.append(Paragraph(f"{status} The site is using a secure transfer protocol (https).", normal_style))
+        if not data.is_https:
+            story.append(Paragraph("If you aren't using an SSL certificate, you are losing potential traffic. Get one installed immediately.", normal_style))
+
+        return story
@@ -0,0 +1,133 @@
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from dataclasses import replace
+from datetime import datetime, timezone
+
+from main import STORE_MAX_AGE_DAYS, AnalysisResult, diff_results, score_checks
+
+
+# Result fields that depend on the response rather than on the HTML.
+RESPONSE_FIELDS = ('response_time', 'is_fresh', 'days_ago')
+
+
+class StoredAudit:
+    __slots__ = ('result', 'version', 'audited', 'report')
+
+    def __init__(self, result, version, audited, report):
+        self.result = result
+        self.version = version
+        self.audited = audited
+        self.report = report
+
+    def audited_at(self):
+        return datetime.fromtimestamp(self.audited, timezone.utc).isoformat(timespec='seconds')
+
+
+class ResultStore:
+    def __init__(self, path, max_age=STORE_MAX_AGE_DAYS * 86400):
+        self.path = path
+        self.max_age = max_age
+        self.reused = 0
+        self.changed = 0
+        self.refreshed = 0
+        self.new = 0
+        self.reports_reused = 0
+        self.changes = []
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('CREATE TABLE IF NOT EXISTS audits (url TEXT, profile TEXT, version TEXT, '
+                             'content_hash TEXT, audited REAL, result TEXT, report TEXT, PRIMARY KEY (url, profile))')
+
+    def get(self, url, profile):
+        with self._lock:
+            row = self._db.execute('SELECT result, version, audited, report FROM audits WHERE url = ? AND profile = ?',
+                                   (url, profile)).fetchone()
+        if row is None:
+            return None
+        return StoredAudit(AnalysisResult.from_dict(json.loads(row[0])), row[1], row[2], row[3])
+
+    def unchanged(self, previous, content_hash, version):
+        return (previous is not None and previous.result.content_hash == content_hash and previous.version == version
+                and time.time() - previous.audited <= self.max_age)
+
+    def reuse(self, previous, current, checks):
+        # The HTML is unchanged, but the response time and Last-Modified date come from the new response.
+        result = replace(previous.result, **{name: getattr(current, name) for name in RESPONSE_FIELDS})
+        score_checks(checks, result)
+        result.reused = True
+        result.previous_audit = previous.audited_at()
+        result.diff = None
+        if result.check_results != previous.result.check_results:
+            result.diff = diff_results(previous.result, result)
+        if result.diff is not None or result.days_ago != previous.result.days_ago:
+            # Store the merged result, so a change is reported once and the outdated report is rendered again.
+            record = json.dumps(dict(result.to_dict(), stages={}, process_peak_rss_mb=None, reused=False),
+                                ensure_ascii=False)
+            with self._lock, self._db:
+                self._db.execute('UPDATE audits SET result = ?, report = NULL WHERE url = ? AND profile = ?',
+                                 (record, result.url, result.profile))
+        with self._lock:
+            self.reused += 1
+            if result.diff is not None:
+                self.changes.append((result.url, result.diff))
+        return result
+
+    def put(self, result, version, previous=None):
+        if previous is not None:
+            result.previous_audit = previous.audited_at()
+            result.diff = diff_results(previous.result, result)
+        record = json.dumps(dict(result.to_dict(), stages={}, process_peak_rss_mb=None), ensure_ascii=False)
+        with self._lock, self._db:
+            self._db.execute('INSERT OR REPLACE INTO audits VALUES (?, ?, ?, ?, ?, ?, NULL)',
+                             (result.url, result.profile, version, result.content_hash, time.time(), record))
+            if previous is None:
+                self.new += 1
+            elif previous.result.content_hash == result.content_hash:
+                self.refreshed += 1
+            else:
+                self.changed += 1
+            if previous is not None and (result.diff['checks'] or result.diff['score'][0] != result.diff['score'][1]):
+                self.changes.append((result.url, result.diff))
+        return result
+
+    def report(self, url, profile):
+        with self._lock:
+            row = self._db.execute('SELECT report FROM audits WHERE url = ? AND profile = ?', (url, profile)).fetchone()
+        return row[0] if row else None
+
+    def set_report(self, url, profile, path):
+        with self._lock, self._db:
+            self._db.execute('UPDATE audits SET report = ? WHERE url = ? AND profile = ?',
+                             (os.path.abspath(path), url, profile))
+
+    def reuse_report(self, result, output_file):
+        if not result.reused or result.diff is not None:
+            return False
+        report = self.report(result.url, result.profile)
+        if not report or not os.path.exists(report):
+            return False
+        # The report shows the day it was rendered and the age of the content, so it is reused on that day only.
+        if datetime.fromtimestamp(os.path.getmtime(report)).date() != datetime.now().date():
+            return False
+        if os.path.abspath(output_file) != report:
+            shutil.copyfile(report, output_file)
+        with self._lock:
+            self.reports_reused += 1
+        return True
+
+    def stats(self):
+        with self._lock:
+            size = self._db.execute('SELECT COUNT(*) FROM audits').fetchone()[0]
+            return {'reused': self.reused, 'changed': self.changed, 'refreshed': self.refreshed, 'new': self.new,
+                    'reports_reused': self.reports_reused, 'changes': list(self.changes), 'size': size}
+
+    def close(self):
+        with self._lock:
+            self._db.close()